@@ -0,0 +1,25 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+def _is_management_command():
+    """True under manage.py/django-admin, except for runserver."""
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    return program in ('manage.py', 'django-admin') and sys.argv[1:2] != ['runserver']
+
+
+class EventsConfig(AppConfig):
+    name = 'events'
+
+    def ready(self):
+        # Drain rows a previous process left in the spool without waiting for
+        # this one's first request. Commands don't serve requests, so they
+        # leave the spool to the server processes.
+        if settings.EVENT_DELIVERY_MODE != 'async' or _is_management_command():
+            return
+        from . import spool
+        from .views import _deliver_spooled
+        spool.start_dispatcher(_deliver_spooled)
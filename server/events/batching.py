@@ -0,0 +1,96 @@
+"""Micro-batching for outbound platform deliveries.
+
+Events are collected per (platform, pixel) bucket and handed to a batch
+sender when a bucket reaches `max_size` or its oldest event has waited
+`max_wait` seconds. Each `submit` returns a Future that resolves to that
+event's own (status, result) once its batch has been sent.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, send_batch, max_size=50, max_wait=0.2, executor_for=None):
+        # send_batch(platform, key, items) -> [(status, result), ...] in item order
+        self.send_batch = send_batch
+        # executor_for(platform) -> Executor that runs that platform's sends;
+        # without it batches are sent on the flushing thread.
+        self.executor_for = executor_for
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, platform, key, item):
+        future = Future()
+        with self._cond:
+            bucket = self._buckets.get((platform, key))
+            if bucket is None:
+                bucket = self._buckets[(platform, key)] = (time.monotonic(), [])
+            bucket[1].append((item, future))
+            # Wake the flusher for a new bucket (new deadline) or a full one.
+            if len(bucket[1]) == 1 or len(bucket[1]) >= self.max_size:
+                self._cond.notify()
+            self._ensure_thread()
+        return future
+
+    def flush(self):
+        """Send everything that is pending now, without waiting for the timer."""
+        with self._cond:
+            ready = list(self._buckets.items())
+            self._buckets.clear()
+        for (platform, key), (_, entries) in ready:
+            self._dispatch(platform, key, entries)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='capi-batcher', daemon=True)
+            self._thread.start()
+
+    def _take_ready(self):
+        now = time.monotonic()
+        ready = []
+        for bucket_key, (started, entries) in list(self._buckets.items()):
+            if len(entries) >= self.max_size or now - started >= self.max_wait:
+                del self._buckets[bucket_key]
+                ready.append((bucket_key, entries))
+        return ready
+
+    def _next_timeout(self):
+        if not self._buckets:
+            return None
+        oldest = min(started for started, _ in self._buckets.values())
+        return max(0.0, oldest + self.max_wait - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                ready = self._take_ready()
+                while not ready:
+                    self._cond.wait(self._next_timeout())
+                    ready = self._take_ready()
+            for (platform, key), entries in ready:
+                self._dispatch(platform, key, entries)
+
+    def _dispatch(self, platform, key, entries):
+        if self.executor_for is None:
+            self._send(platform, key, entries)
+        else:
+            self.executor_for(platform).submit(self._send, platform, key, entries)
+
+    def _send(self, platform, key, entries):
+        for offset in range(0, len(entries), self.max_size):
+            chunk = entries[offset:offset + self.max_size]
+            try:
+                results = self.send_batch(platform, key, [item for item, _ in chunk])
+            except Exception as e:
+                # Results reach clients; the exception text stays in the log.
+                logger.warning('batch send failed', extra={'platform': platform, 'error': str(e) or type(e).__name__})
+                results = [(500, {'error': f'{platform} delivery failed'})] * len(chunk)
+            for (_, future), result in zip(chunk, results):
+                future.set_result(result)
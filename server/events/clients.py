@@ -0,0 +1,94 @@
+"""Per-process registry of pooled HTTP sessions, one per ad platform.
+
+Each platform gets a single `requests.Session` whose connection pool keeps
+TCP+TLS connections to its API host alive between events. Sessions are
+created once and never reconfigured afterwards, so they can be shared by the
+request threads, the dispatch pool and the batcher.
+
+The ASGI ingest path uses an `aiohttp.ClientSession` instead (optional
+dependency), one per platform per event loop, with at most
+ASYNC_HTTP_MAX_CONNECTIONS connections each; `aclose_all` closes a loop's
+sessions when the ASGI server shuts down (see server/asgi.py).
+"""
+import asyncio
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from . import jsoncodec
+
+try:
+    import aiohttp
+except ImportError:
+    # Without aiohttp the ASGI view delivers through the sync path in a thread.
+    aiohttp = None
+
+PLATFORMS = ('meta', 'tiktok', 'reddit')
+
+_sessions = {}
+_lock = threading.Lock()
+# Async clients are bound to the loop they were created on.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.HTTP_POOL_SIZE,
+        pool_block=True,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not settings.HTTP_KEEPALIVE:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def get_session(platform):
+    session = _sessions.get(platform)
+    if session is None:
+        with _lock:
+            session = _sessions.get(platform)
+            if session is None:
+                session = _sessions[platform] = _build_session()
+    return session
+
+
+def get_async_client(platform):
+    """This event loop's aiohttp.ClientSession for `platform`; requires aiohttp."""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(platform)
+    if client is None:
+        client = clients[platform] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+                force_close=not settings.HTTP_KEEPALIVE,
+            ),
+        )
+    return client
+
+
+async def apost(platform, url, timeout, **kwargs):
+    """POST through the platform's async client; returns (status, parsed JSON body)."""
+    async with get_async_client(platform).post(
+        url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs,
+    ) as resp:
+        return resp.status, jsoncodec.loads(await resp.read())
+
+
+def close_all():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+async def aclose_all():
+    """Close the running event loop's aiohttp sessions."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
@@ -0,0 +1,49 @@
+"""NDJSON event corpora for repeatable load tests.
+
+A corpus holds one canonical event (the dict `generate_traffic` builds) per
+line and is gzipped when its path ends in `.gz`. `generate_traffic --output`
+writes one and `replay_traffic` streams it back. Reading never holds more
+than one line in memory: plain files are memory-mapped and gzipped ones are
+decompressed as they are read.
+"""
+import gzip
+import mmap
+import os
+
+from . import jsoncodec
+
+
+def _is_gzip(path):
+    return str(path).endswith('.gz')
+
+
+def write_events(path, batches):
+    """Write every event in `batches` (an iterable of lists) to `path`; returns the count."""
+    count = 0
+    # Level 3 is about twice as fast as zlib's default of 6 on corpus
+    # text, for files roughly 10% larger (gzip's own default of 9 is slower still).
+    f = gzip.open(path, 'wb', compresslevel=3) if _is_gzip(path) else open(path, 'wb')
+    with f:
+        for batch in batches:
+            f.write(b''.join([jsoncodec.dumps(event) + b'\n' for event in batch]))
+            count += len(batch)
+    return count
+
+
+def _lines(path):
+    if _is_gzip(path):
+        with gzip.open(path, 'rb') as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b'')
+
+
+def read_events(path):
+    """Yield the events in the corpus at `path`, one line at a time."""
+    for line in _lines(path):
+        if line.strip():
+            yield jsoncodec.loads(line)
@@ -0,0 +1,20 @@
+"""Thread-local SQLite connections for the on-disk spool and event store."""
+import sqlite3
+import threading
+
+_local = threading.local()
+
+
+def connect(path, schema):
+    """Return this thread's autocommit WAL connection to `path`, creating `schema` once."""
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(schema)
+        conns[path] = conn
+    return conn
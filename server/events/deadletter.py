@@ -0,0 +1,151 @@
+"""Dead-letter store for platform deliveries that failed.
+
+When `resilience.call` or `acall` ends with a failure that resending could
+fix (a retryable status: 408, 429 or 5xx), the platform events it was
+sending (already built for that platform) are written to this SQLite
+table, one row per event. A 4xx or TikTok error code rejects the events
+themselves and is not stored. Each row is tagged with the platform, pixel, API
+base URL, last status, error and attempts made. This covers errors left
+after the last retry, an open breaker or full bulkhead, and a deadline that
+passed before the first attempt. `manage.py redrive_events` resends the rows
+in batches and deletes the ones that go through or are rejected; it only resends rows whose
+base URL matches the current setting, so failures recorded against
+`mock_platforms` are never sent to the real APIs.
+
+EVENT_DEADLETTER_PATH='' turns the store off.
+"""
+import logging
+import sqlite3
+import time
+
+from django.conf import settings
+
+from . import db, jsoncodec, metrics
+from .platforms import base_url
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    failed_at REAL NOT NULL,
+    platform TEXT NOT NULL,
+    pixel_id TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    status INTEGER,
+    error TEXT,
+    attempts INTEGER NOT NULL,
+    redrives INTEGER NOT NULL DEFAULT 0,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dead_letters_target ON dead_letters (platform, base_url, pixel_id, id);
+'''
+
+
+def enabled():
+    return bool(settings.EVENT_DEADLETTER_PATH)
+
+
+def _connect():
+    return db.connect(settings.EVENT_DEADLETTER_PATH, _SCHEMA)
+
+
+def error_message(result):
+    """A one-line error from a platform response or a local failure result."""
+    if isinstance(result, dict):
+        error = result.get('error')
+        if isinstance(error, dict):
+            return error.get('message') or jsoncodec.dumps_str(error)
+        if error:
+            return str(error)
+        if result.get('message'):
+            return str(result['message'])
+    return jsoncodec.dumps_str(result)
+
+
+def record(platform, pixel_id, events, status, result, attempts):
+    """Store each of `events` as failed; errors are logged, never raised to the delivery path."""
+    if not enabled() or not events:
+        return
+    now = time.time()
+    url = base_url(platform)
+    error = error_message(result)
+    try:
+        conn = _connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO dead_letters (failed_at, platform, pixel_id, base_url, status, error, attempts, event) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(now, platform, str(pixel_id), url, status, error, attempts, jsoncodec.dumps_str(event))
+                 for event in events],
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        logger.error('dead-letter write failed', extra={'platform': platform, 'events': len(events), 'error': str(e)})
+        return
+    metrics.inc('events_deadletter_total', len(events), platform=platform)
+
+
+def depth():
+    """{platform: rows waiting}."""
+    return dict(_connect().execute('SELECT platform, COUNT(*) FROM dead_letters GROUP BY platform').fetchall())
+
+
+def targets(platforms=None):
+    """{(platform, base_url, pixel_id): rows waiting}, optionally limited to `platforms`."""
+    rows = _connect().execute(
+        'SELECT platform, base_url, pixel_id, COUNT(*) FROM dead_letters '
+        'GROUP BY platform, base_url, pixel_id ORDER BY platform',
+    ).fetchall()
+    return {
+        (platform, url, pixel): count for platform, url, pixel, count in rows
+        if not platforms or platform in platforms
+    }
+
+
+def pending(platform, url, pixel_id, after_id=0, limit=100, failed_since=0.0, max_attempts=0):
+    """Up to `limit` rows for one target after `after_id`: [(id, attempts, event)].
+
+    Rows that failed before `failed_since` (unix seconds), or that have
+    already had `max_attempts` attempts (when set), are left out.
+    """
+    query = (
+        'SELECT id, attempts, event FROM dead_letters '
+        'WHERE platform = ? AND base_url = ? AND pixel_id = ? AND id > ? AND failed_at >= ?'
+    )
+    params = [platform, url, pixel_id, after_id, failed_since]
+    if max_attempts:
+        query += ' AND attempts < ?'
+        params.append(max_attempts)
+    query += ' ORDER BY id LIMIT ?'
+    params.append(limit)
+    rows = _connect().execute(query, params).fetchall()
+    return [(row_id, attempts, jsoncodec.loads(event)) for row_id, attempts, event in rows]
+
+
+def resolve(ids):
+    """Delete rows that have now been delivered."""
+    _connect().executemany('DELETE FROM dead_letters WHERE id = ?', [(row_id,) for row_id in ids])
+
+
+def mark_failed(ids, status, result, attempts):
+    """Record another failed redrive of `ids` that made `attempts` attempts."""
+    _connect().executemany(
+        'UPDATE dead_letters SET status = ?, error = ?, attempts = attempts + ?, redrives = redrives + 1 '
+        'WHERE id = ?',
+        [(status, error_message(result), attempts, row_id) for row_id in ids],
+    )
+
+
+def purge(failed_before, platforms=None):
+    """Delete rows that failed before `failed_before` (unix seconds); returns how many."""
+    query = 'DELETE FROM dead_letters WHERE failed_at < ?'
+    params = [failed_before]
+    if platforms:
+        query += f' AND platform IN ({", ".join("?" * len(platforms))})'
+        params.extend(platforms)
+    return _connect().execute(query, params).rowcount
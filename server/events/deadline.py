@@ -0,0 +1,43 @@
+"""End-to-end time budget for delivering one ingest request."""
+import time
+
+# Recorded for a platform whose delivery could not finish within the budget.
+DEADLINE_STATUS = 504
+
+
+def timed_out_result():
+    """A call the budget ran out on: it finishes in the background, or is dead-lettered for redrive."""
+    return DEADLINE_STATUS, {'error': 'deadline exceeded', 'deferred': True}
+
+
+def expired_result():
+    """A call never started because the budget was already spent."""
+    return DEADLINE_STATUS, {'error': 'deadline exceeded before sending'}
+
+
+def is_deferred(result):
+    return isinstance(result, dict) and result.get('deferred') is True
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_ms(cls, ms):
+        """A Deadline for `ms` milliseconds, or None when no budget is configured."""
+        return cls(ms / 1000) if ms else None
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def split(self, parts):
+        """A child deadline holding an even share of the remaining time."""
+        return Deadline(self.remaining() / max(1, parts))
+
+    def timeout(self, cap):
+        """Timeout for one outbound call: the remaining budget, at most `cap`."""
+        return min(cap, self.remaining())
@@ -0,0 +1,120 @@
+"""event_id deduplication in front of platform delivery.
+
+Browser retries and double submits reuse the same event_id, so the first
+(event_name, event_id) seen within EVENT_DEDUP_TTL_SECONDS is delivered and
+later copies are dropped before any platform work. If no platform accepts
+the delivery, `release` forgets the key again, so the client's retry is
+sent rather than dropped. The default backend is a
+bounded in-process LRU; EVENT_DEDUP_BACKEND=sqlite keeps the keys in a file
+shared by every gunicorn worker on the box.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import db, metrics
+
+
+class MemoryDedupCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._expiry = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def seen(self, key):
+        """Record `key`; True if it was already recorded and has not expired."""
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._expiry.get(key)
+            if expires_at is not None and expires_at > now:
+                self._expiry.move_to_end(key)
+                return True
+            self._expiry[key] = now + self.ttl
+            self._expiry.move_to_end(key)
+            while len(self._expiry) > self.max_size:
+                self._expiry.popitem(last=False)
+            return False
+
+    def forget(self, key):
+        with self._lock:
+            self._expiry.pop(key, None)
+
+
+class SqliteDedupCache:
+    SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS dedup (
+        key TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS dedup_expires_at ON dedup (expires_at);
+    '''
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._calls = 0
+
+    def __len__(self):
+        return db.connect(self.path, self.SCHEMA).execute('SELECT COUNT(*) FROM dedup').fetchone()[0]
+
+    def seen(self, key):
+        now = time.time()
+        conn = db.connect(self.path, self.SCHEMA)
+        # Inserts a new key or revives an expired one; a live key changes nothing.
+        cur = conn.execute(
+            'INSERT INTO dedup (key, expires_at) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at '
+            'WHERE dedup.expires_at <= ?',
+            (key, now + self.ttl, now),
+        )
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM dedup WHERE expires_at <= ?', (now,))
+        return cur.rowcount == 0
+
+    def forget(self, key):
+        db.connect(self.path, self.SCHEMA).execute('DELETE FROM dedup WHERE key = ?', (key,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if settings.EVENT_DEDUP_BACKEND == 'sqlite':
+                    _cache = SqliteDedupCache(settings.EVENT_DEDUP_PATH, settings.EVENT_DEDUP_TTL_SECONDS)
+                else:
+                    _cache = MemoryDedupCache(settings.EVENT_DEDUP_MAX_SIZE, settings.EVENT_DEDUP_TTL_SECONDS)
+    return _cache
+
+
+def _key(event_data):
+    return f'{event_data["event_name"]}:{event_data["event_id"]}'
+
+
+def is_duplicate(event_data):
+    """True if this event_id/event_name pair was already accepted recently."""
+    if not settings.EVENT_DEDUP or not event_data.get('event_id'):
+        return False
+    duplicate = get_cache().seen(_key(event_data))
+    metrics.inc('events_dedup_checked_total')
+    if duplicate:
+        metrics.inc('events_dedup_duplicates_total')
+    return duplicate
+
+
+def release(event_data):
+    """Forget an accepted event that no platform took, so a retry of it is delivered."""
+    if settings.EVENT_DEDUP and event_data.get('event_id'):
+        get_cache().forget(_key(event_data))
@@ -0,0 +1,70 @@
+"""Fixed-capacity, in-memory ring buffer for the `/api/event-log` feed.
+
+Entries are serialized to JSON once, when they are appended, and only the
+bytes plus a few lookup fields are kept. Serving the log joins those bytes,
+and the joined body is cached until the next append, so a poll never
+re-encodes entries and memory is bounded by the capacity.
+"""
+import threading
+
+from . import jsoncodec
+
+
+class LogEntry:
+    __slots__ = ('timestamp', 'event_name', 'event_id', 'data')
+
+    def __init__(self, timestamp, event_name, event_id, data):
+        self.timestamp = timestamp
+        self.event_name = event_name
+        self.event_id = event_id
+        self.data = data
+
+
+class EventLog:
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self._slots = [None] * self.capacity
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._rendered = None
+
+    def __len__(self):
+        return self._size
+
+    def append(self, entry):
+        """Store an entry and return its encoded JSON bytes."""
+        record = LogEntry(
+            entry.get('timestamp'),
+            entry.get('event_name'),
+            entry.get('event_id'),
+            jsoncodec.dumps(entry),
+        )
+        with self._lock:
+            self._slots[self._next] = record
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self._rendered = None
+        return record.data
+
+    def _iter_newest(self):
+        # Caller holds self._lock.
+        for offset in range(1, self._size + 1):
+            yield self._slots[(self._next - offset) % self.capacity]
+
+    def newest_first(self):
+        with self._lock:
+            return list(self._iter_newest())
+
+    def render(self, limit=None):
+        """JSON array bytes of the newest `limit` entries (all by default)."""
+        with self._lock:
+            if limit is not None and limit < self._size:
+                return self._join(entry for entry, _ in zip(self._iter_newest(), range(limit)))
+            if self._rendered is None:
+                self._rendered = self._join(self._iter_newest())
+            return self._rendered
+
+    @staticmethod
+    def _join(entries):
+        return b'[' + b', '.join(entry.data for entry in entries) + b']'
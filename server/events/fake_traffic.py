@@ -1,6 +1,17 @@
+import bisect
+import gc
 import random
 import string
 import time
+from contextlib import contextmanager
+
+from .hashing import hash_identifier
+
+try:
+    import numpy as np
+except ImportError:
+    # generate_events_batch falls back to the random module.
+    np = None
 
 SITE_URL = 'https://snoocommerce.onrender.com'
 
@@ -118,6 +129,12 @@ FAKE_USERS = [
     {'name': 'Priya Patel', 'email': 'priya.patel@example.com', 'phone': '5558901234'},
 ]
 
+# Synthetic identities with their hashed email/phone computed once at import.
+HASHED_USERS = [
+    {**user, 'em': hash_identifier(user['email']), 'ph': hash_identifier(user['phone'])}
+    for user in FAKE_USERS
+]
+
 USER_AGENTS = [
     'Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.101 Mobile Safari/537.36',
     'Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.230 Mobile Safari/537.36',
@@ -153,6 +170,29 @@ IP_POOL = [
     '103.28.121.70',
 ]
 
+# Warm the shared hash cache with the pool's IP hashes (used by Reddit CAPI).
+HASHED_IPS = {ip: hash_identifier(ip) for ip in IP_POOL}
+
+EVENT_WEIGHTS = [
+    ('ViewContent', 40),
+    ('AddToCart', 25),
+    ('Purchase', 20),
+    ('Lead', 15),
+]
+EVENT_NAMES = [name for name, _ in EVENT_WEIGHTS]
+EVENT_CUMULATIVE = []
+_total = 0
+for _name, _weight in EVENT_WEIGHTS:
+    _total += _weight
+    EVENT_CUMULATIVE.append(_total)
+
+# Events that carry click IDs (fbc, ttclid, Reddit click_id) and the ones
+# that carry hashed email/phone.
+CLICK_ID_EVENTS = frozenset({'ViewContent', 'Purchase'})
+IDENTIFIED_EVENTS = frozenset({'ViewContent', 'AddToCart', 'Purchase'})
+
+CLICK_ID_CHARS = string.ascii_letters + string.digits
+
 PAGE_URLS = [
     f'{SITE_URL}/',
     f'{SITE_URL}/cart',
@@ -161,6 +201,10 @@ PAGE_URLS = [
 ]
 
 
+def pick_event_name():
+    return EVENT_NAMES[bisect.bisect_left(EVENT_CUMULATIVE, random.randint(1, EVENT_CUMULATIVE[-1]))]
+
+
 def random_user_agent():
     return random.choice(USER_AGENTS)
 
@@ -173,6 +217,11 @@ def random_user():
     return random.choice(FAKE_USERS).copy()
 
 
+def random_hashed_user():
+    """A synthetic identity including its pre-hashed 'em' and 'ph'; do not mutate."""
+    return random.choice(HASHED_USERS)
+
+
 def random_products(min_count=1, max_count=3):
     count = random.randint(min_count, max_count)
     return random.sample(PRODUCTS, count)
@@ -199,17 +248,211 @@ def random_event_source_url(event_name, products=None):
 def random_fbclid():
     """fb.1.{unix_ms}.{62 alphanumeric chars}"""
     ts = int(time.time() * 1000)
-    chars = string.ascii_letters + string.digits
-    rand_part = ''.join(random.choices(chars, k=62))
+    rand_part = ''.join(random.choices(CLICK_ID_CHARS, k=62))
     return f'fb.1.{ts}.{rand_part}'
 
 
 def random_ttclid():
     """~26 alphanumeric characters"""
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choices(chars, k=26))
+    return ''.join(random.choices(CLICK_ID_CHARS, k=26))
 
 
 def random_rdt_cid():
     """~19-digit numeric string"""
     return str(random.randint(10**18, 10**19 - 1))
+
+
+# --- Batch generation ----------------------------------------------------------
+
+BATCH_CHUNK_SIZE = 65536
+
+_PRODUCT_IDS = [str(p['id']) for p in PRODUCTS]
+_PRODUCT_NAMES = [p['name'] for p in PRODUCTS]
+_PRODUCT_PRICES = [p['price'] for p in PRODUCTS]
+_PRODUCT_URLS = [f'{SITE_URL}/product/{p["id"]}' for p in PRODUCTS]
+_CART_URL = f'{SITE_URL}/cart'
+_PAYMENT_URL = f'{SITE_URL}/payment'
+
+
+def _fixed_width(data, width):
+    """Split an ASCII byte string into `width`-character strings."""
+    text = data.decode('ascii')
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+# Hex digit -> the RFC 4122 variant digit (8, 9, a or b) it becomes.
+_UUID_VARIANT = {digit: '89ab'[int(digit, 16) & 3] for digit in '0123456789abcdef'}
+
+
+def _uuid4_strings(raw):
+    """Version-4 UUID strings, one per 16 bytes of `raw`."""
+    return [
+        f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{_UUID_VARIANT[h[16]]}{h[17:20]}-{h[20:]}'
+        for h in _fixed_width(raw.hex().encode(), 32)
+    ]
+
+
+# Random bytes map onto CLICK_ID_CHARS; the top 8 values are dropped so
+# every character stays equally likely.
+_CLICK_ID_TABLE = bytes(CLICK_ID_CHARS.encode()[i % len(CLICK_ID_CHARS)] for i in range(256))
+_CLICK_ID_SKIP = bytes(range(256 - 256 % len(CLICK_ID_CHARS), 256))
+
+
+def _random_click_ids(rng, count, width):
+    needed = count * width
+    data = b''
+    while len(data) < needed:
+        data += rng.randbytes(needed - len(data) + 64).translate(_CLICK_ID_TABLE, _CLICK_ID_SKIP)
+    return _fixed_width(data[:needed], width)
+
+
+def _numpy_columns(n, rng):
+    """One list per event field, each drawn for all `n` events in a few array operations."""
+    names = np.searchsorted(EVENT_CUMULATIVE, rng.integers(1, EVENT_CUMULATIVE[-1] + 1, n))
+    counts = rng.integers(1, 4, n)
+    # Three distinct products per event: draw from a shrinking range and step
+    # past the indices already taken.
+    first = rng.integers(0, len(PRODUCTS), n)
+    second = rng.integers(0, len(PRODUCTS) - 1, n)
+    second += second >= first
+    third = rng.integers(0, len(PRODUCTS) - 2, n)
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    third += third >= low
+    third += third >= high
+
+    click_ids = np.isin(names, [EVENT_NAMES.index(name) for name in CLICK_ID_EVENTS]).tolist()
+    m = sum(click_ids)
+    alphabet = np.frombuffer(CLICK_ID_CHARS.encode(), dtype=np.uint8)
+    fbclids = iter(_fixed_width(alphabet[rng.integers(0, len(alphabet), (m, 62))].tobytes(), 62))
+    ttclids = iter(_fixed_width(alphabet[rng.integers(0, len(alphabet), (m, 26))].tobytes(), 26))
+    rdt_cids = iter(rng.integers(10**18, 10**19, m, dtype=np.uint64).tolist())
+
+    return {
+        'name': names.tolist(),
+        'products': np.stack([first, second, third], axis=1).tolist(),
+        'count': counts.tolist(),
+        'page_pick': rng.integers(0, 6, n).tolist(),
+        'user': rng.integers(0, len(HASHED_USERS), n).tolist(),
+        'user_agent': rng.integers(0, len(USER_AGENTS), n).tolist(),
+        'ip': rng.integers(0, len(IP_POOL), n).tolist(),
+        'event_id': _uuid4_strings(rng.bytes(16 * n)),
+        'fbclid': [next(fbclids) if flag else None for flag in click_ids],
+        'ttclid': [next(ttclids) if flag else None for flag in click_ids],
+        'rdt_cid': [next(rdt_cids) if flag else None for flag in click_ids],
+    }
+
+
+def _random_columns(n, rng):
+    """`_numpy_columns` without NumPy: one `random.Random` call per field where possible."""
+    names = [
+        bisect.bisect_left(EVENT_CUMULATIVE, r)
+        for r in rng.choices(range(1, EVENT_CUMULATIVE[-1] + 1), k=n)
+    ]
+    click_ids = [EVENT_NAMES[name] in CLICK_ID_EVENTS for name in names]
+    m = sum(click_ids)
+    fbclids = iter(_random_click_ids(rng, m, 62))
+    ttclids = iter(_random_click_ids(rng, m, 26))
+    return {
+        'name': names,
+        'products': [rng.sample(range(len(PRODUCTS)), 3) for _ in range(n)],
+        'count': rng.choices((1, 2, 3), k=n),
+        'page_pick': rng.choices(range(6), k=n),
+        'user': rng.choices(range(len(HASHED_USERS)), k=n),
+        'user_agent': rng.choices(range(len(USER_AGENTS)), k=n),
+        'ip': rng.choices(range(len(IP_POOL)), k=n),
+        'event_id': _uuid4_strings(rng.randbytes(16 * n)),
+        'fbclid': [next(fbclids) if flag else None for flag in click_ids],
+        'ttclid': [next(ttclids) if flag else None for flag in click_ids],
+        'rdt_cid': [rng.randint(10**18, 10**19 - 1) if flag else None for flag in click_ids],
+    }
+
+
+def _event_source_url(event_name, products, page_pick):
+    # page_pick is uniform over 0..5, which divides evenly by 1, 2 and 3 products.
+    if event_name == 'ViewContent':
+        return _PRODUCT_URLS[products[page_pick % len(products)]]
+    if event_name == 'AddToCart':
+        return _CART_URL if page_pick % 2 else _PRODUCT_URLS[products[page_pick // 2 % len(products)]]
+    return _PAYMENT_URL
+
+
+def _assemble(columns, event_time, fbc_prefix):
+    events = []
+    for name, products, count, page_pick, user, user_agent, ip, event_id, fbclid, ttclid, rdt_cid in zip(
+        columns['name'], columns['products'], columns['count'], columns['page_pick'], columns['user'],
+        columns['user_agent'], columns['ip'], columns['event_id'], columns['fbclid'], columns['ttclid'],
+        columns['rdt_cid'],
+    ):
+        event_name = EVENT_NAMES[name]
+        products = products[:count]
+        user_data = {
+            'client_user_agent': USER_AGENTS[user_agent],
+            'client_ip_address': IP_POOL[ip],
+        }
+        event_data = {
+            'event_name': event_name,
+            'event_time': event_time,
+            'event_id': event_id,
+            'action_source': 'website',
+            'event_source_url': _event_source_url(event_name, products, page_pick),
+            'user_data': user_data,
+            'custom_data': {
+                'content_type': 'product',
+                'content_ids': [_PRODUCT_IDS[i] for i in products],
+                'content_names': [_PRODUCT_NAMES[i] for i in products],
+                'currency': 'USD',
+                'value': round(sum(_PRODUCT_PRICES[i] for i in products), 2),
+            },
+        }
+        if event_name in IDENTIFIED_EVENTS:
+            hashed = HASHED_USERS[user]
+            user_data['em'] = [hashed['em']]
+            user_data['ph'] = [hashed['ph']]
+        if fbclid is not None:
+            user_data['fbc'] = fbc_prefix + fbclid
+            user_data['ttclid'] = ttclid
+            event_data['click_id'] = str(rdt_cid)
+        events.append(event_data)
+    return events
+
+
+@contextmanager
+def _gc_paused():
+    """Hold off cyclic GC, which otherwise rescans every new event dict many times over."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def iter_event_batches(n, seed=None, event_time=None, chunk_size=BATCH_CHUNK_SIZE):
+    """`generate_events_batch` in lists of at most `chunk_size`, to bound memory."""
+    rng = np.random.default_rng(seed) if np is not None else random.Random(seed)
+    columns = _numpy_columns if np is not None else _random_columns
+    click_ms = int(time.time() * 1000) if event_time is None else event_time * 1000
+    event_time = int(time.time()) if event_time is None else event_time
+    fbc_prefix = f'fb.1.{click_ms}.'
+    for start in range(0, n, chunk_size):
+        with _gc_paused():
+            chunk = _assemble(columns(min(chunk_size, n - start), rng), event_time, fbc_prefix)
+        yield chunk
+
+
+def generate_events_batch(n, seed=None, event_time=None):
+    """`n` canonical events shaped like generate_traffic's, sampled a column at a time.
+
+    Event names, products, users, user agents, IPs, event ids and click IDs
+    are each drawn for the whole batch at once, with NumPy when it is
+    installed and the random module otherwise; the only per-event Python
+    work left is assembling the dicts. A seed plus a fixed `event_time`
+    (unix seconds, default now) reproduces the same events with the same
+    backend; the two backends draw differently.
+    """
+    events = []
+    with _gc_paused():
+        for chunk in iter_event_batches(n, seed, event_time):
+            events.extend(chunk)
+    return events
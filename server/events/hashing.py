@@ -0,0 +1,16 @@
+"""Memoized normalization + SHA-256 for PII and IP identifiers.
+
+The same emails, phones and IPs recur constantly (returning shoppers, the
+synthetic identity pools), so hashes are cached in a bounded LRU shared by
+the ingest view, the payload builders and the traffic generators.
+"""
+import hashlib
+from functools import lru_cache
+
+HASH_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def hash_identifier(value):
+    """Lowercase, strip and SHA-256 hex-digest an identifier."""
+    return hashlib.sha256(value.lower().strip().encode()).hexdigest()
@@ -0,0 +1,49 @@
+"""JSON encoding and decoding for the ingest path, the event log and the commands.
+
+Uses orjson (optional dependency) when it is installed and JSON_CODEC
+allows it, otherwise the stdlib `json` module. Either way `dumps` returns
+compact UTF-8 bytes, `loads` accepts bytes or str, and values JSON has no
+type for (datetimes, Decimals, UUIDs, lazy strings) are encoded the way
+DjangoJSONEncoder does. Decode errors are ValueErrors with both backends.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if settings.JSON_CODEC not in ('auto', 'orjson', 'stdlib'):
+    raise ImproperlyConfigured(f'JSON_CODEC must be auto, orjson or stdlib, not {settings.JSON_CODEC!r}')
+if settings.JSON_CODEC == 'orjson' and orjson is None:
+    raise ImproperlyConfigured('JSON_CODEC is orjson but orjson is not installed')
+
+BACKEND = 'orjson' if orjson is not None and settings.JSON_CODEC != 'stdlib' else 'stdlib'
+
+_django_default = DjangoJSONEncoder().default
+
+if BACKEND == 'orjson':
+    def dumps(obj, default=_django_default):
+        return orjson.dumps(obj, default=default)
+
+    loads = orjson.loads
+else:
+    def dumps(obj, default=_django_default):
+        return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode()
+
+    loads = json.loads
+
+
+def dumps_str(obj, default=_django_default):
+    """`dumps` as text, for SQLite TEXT columns, form fields and log lines."""
+    return dumps(obj, default).decode()
+
+
+def json_response(data, status=200):
+    """JsonResponse built from `dumps` bytes; lists are allowed as well as dicts."""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
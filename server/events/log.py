@@ -0,0 +1,102 @@
+"""Non-blocking, structured (JSON lines) logging for the events app.
+
+`AsyncStreamHandler` only puts records on a bounded in-memory queue; a
+background QueueListener thread formats them and writes to stdout. When the
+queue is full, records are dropped and counted instead of stalling the
+request thread on log I/O. A forked child gets a fresh queue and listener,
+since the parent's thread does not survive the fork.
+
+Platform deliveries log to `events.meta`, `events.tiktok` and
+`events.reddit` (levels set per platform in settings.LOGGING). Failures are
+always logged; successes only for a LOG_SUCCESS_SAMPLE_RATE fraction.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+from . import jsoncodec
+from .platforms import is_delivered
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_sampler = random.Random()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        try:
+            return jsoncodec.dumps_str(entry, default=str)
+        except TypeError:
+            # e.g. non-string keys, which orjson refuses.
+            return json.dumps(entry, default=str)
+
+
+class AsyncStreamHandler(QueueHandler):
+    dropped = 0
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self._target = logging.StreamHandler(stream or sys.stdout)
+        self._start()
+        atexit.register(self._stop)
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        # Also run in a forked child, where the queue's lock may be held by
+        # a parent thread that no longer exists: start over with a new one.
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._listener = QueueListener(self.queue, self._target, respect_handler_level=False)
+        self._listener.start()
+
+    def _stop(self):
+        self._listener.stop()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, not the caller's.
+        super().setFormatter(fmt)
+        self._target.setFormatter(fmt)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            AsyncStreamHandler.dropped += 1
+
+
+def log_delivery(platform, event, status, result, **fields):
+    """Log one platform response: failures always, successes sampled."""
+    logger = logging.getLogger(f'events.{platform}')
+    if is_delivered(platform, status, result):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        if _sampler.random() >= settings.LOG_SUCCESS_SAMPLE_RATE:
+            return
+        logger.info('delivered', extra={
+            'platform': platform, 'event': event, 'status': status, 'response': result, **fields,
+        })
+    else:
+        logger.warning('delivery failed', extra={
+            'platform': platform, 'event': event, 'status': status, 'response': result, **fields,
+        })
@@ -0,0 +1,196 @@
+import json
+import logging
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from events import jsoncodec, platforms, views
+from events.fake_traffic import random_fbclid, random_products
+from events.management.commands.bench_ingest import ISOLATED_SETTINGS
+from events.management.commands.generate_traffic import Command as GenerateTraffic, pick_event_name
+
+class _StubResponse:
+    status_code = 200
+    content = b'{}'
+
+
+class _StubSession:
+    def post(self, *args, **kwargs):
+        return _StubResponse()
+
+
+def _log_entry(event_data):
+    return {
+        'timestamp': '2026-01-01T00:00:00+00:00',
+        'event_name': event_data['event_name'],
+        'event_id': event_data['event_id'],
+        'payload_sent': event_data,
+        'meta_status_code': 200,
+        'meta_response': {'events_received': 1},
+    }
+
+
+# name -> callable taking one canonical event from the fixture pool.
+CASES = {
+    'pick_event_name': lambda event: pick_event_name(),
+    'random_products': lambda event: random_products(),
+    'random_fbclid': lambda event: random_fbclid(),
+    'generate_event': lambda event: GenerateTraffic()._build_event(event['event_name']),
+    'tiktok_contents': lambda event: platforms._build_tiktok_contents(event['custom_data']),
+    'reddit_products': lambda event: platforms._build_reddit_products(event['custom_data']),
+    'build_meta_event': platforms.build_meta_event,
+    'build_tiktok_event': platforms.build_tiktok_event,
+    'build_reddit_event': platforms.build_reddit_event,
+    'json_meta_payload': lambda event: jsoncodec.dumps_str([platforms.build_meta_event(event)]),
+    'json_log_entry': lambda event: jsoncodec.dumps(_log_entry(event)),
+    'json_roundtrip': lambda event: jsoncodec.loads(jsoncodec.dumps(event)),
+    'send_to_meta': views._send_to_meta,
+    'send_to_tiktok': views._send_to_tiktok,
+    'send_to_reddit': views._send_to_reddit,
+}
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark payload builders and traffic generators (events/s and bytes allocated per event)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'cases', nargs='*',
+            help=f'Cases to run (default: all): {", ".join(CASES)}',
+        )
+        parser.add_argument(
+            '--min-time', type=float, default=0.5,
+            help='Seconds to time each case for, per repeat (default: 0.5)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Timing repeats per case; the best is kept (default: 3)',
+        )
+        parser.add_argument(
+            '--alloc-calls', type=int, default=200,
+            help='Calls traced with tracemalloc to measure allocations (default: 200)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Baseline JSON to compare against, e.g. one kept in version control; without it nothing is compared',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Write this run to --baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Fail if a case gets this much slower or allocates this much more (default: 0.2)',
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the fixture events (default: 1)')
+
+    def _fixtures(self, count=256):
+        random.seed(self._seed)
+        builder = GenerateTraffic()
+        events = [builder._build_event(pick_event_name()) for _ in range(count)]
+        for event_data in events:
+            event_data['user_data']['external_id'] = f'user-{event_data["event_id"][:8]}'
+        return events
+
+    def _time(self, fn, events, min_time):
+        """Calls per second of `fn` over the fixture pool, looping for at least `min_time`."""
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            for event_data in events:
+                fn(event_data)
+            calls += len(events)
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                return calls / elapsed
+
+    def _allocations(self, fn, events, calls):
+        """Mean peak bytes allocated during one call of `fn`."""
+        total = 0
+        tracemalloc.start()
+        try:
+            for i in range(calls):
+                event_data = events[i % len(events)]
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                fn(event_data)
+                _, peak = tracemalloc.get_traced_memory()
+                total += peak - before
+        finally:
+            tracemalloc.stop()
+        return total / calls
+
+    def handle(self, *args, **options):
+        names = options['cases'] or list(CASES)
+        unknown = [name for name in names if name not in CASES]
+        if unknown:
+            raise CommandError(f'Unknown case(s): {", ".join(unknown)}')
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline PATH to write to')
+        self._seed = options['seed']
+        events = self._fixtures()
+
+        # The _send_to_* cases run with every platform enabled and the HTTP
+        # session stubbed, so they measure payload construction and encoding.
+        tokens = {
+            'META_ACCESS_TOKEN': settings.META_ACCESS_TOKEN or 'bench',
+            'TIKTOK_ACCESS_TOKEN': settings.TIKTOK_ACCESS_TOKEN or 'bench',
+            'REDDIT_ACCESS_TOKEN': settings.REDDIT_ACCESS_TOKEN or 'bench',
+        }
+        results = {}
+        self.stdout.write(f'JSON codec: {jsoncodec.BACKEND}')
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(**tokens, **ISOLATED_SETTINGS), mock.patch.object(platforms, 'get_session', lambda _: _StubSession()):
+                for name in names:
+                    fn = CASES[name]
+                    self._time(fn, events[:32], 0.05)
+                    rate = max(self._time(fn, events, options['min_time']) for _ in range(options['repeat']))
+                    alloc = self._allocations(fn, events, options['alloc_calls'])
+                    results[name] = {'events_per_sec': round(rate), 'bytes_per_event': round(alloc)}
+                    self.stdout.write(f'  {name:<20} {rate:>12,.0f} events/s {alloc:>10,.0f} B/event')
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if not options['baseline']:
+            return
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'json_codec': jsoncodec.BACKEND,
+                'cases': results,
+            }, indent=2) + '\n')
+            self.stdout.write(f'Baseline written to {baseline_path}')
+        elif baseline_path.exists():
+            self._compare(results, json.loads(baseline_path.read_text()), options['tolerance'])
+        else:
+            raise CommandError(f'No baseline at {baseline_path}; run with --save-baseline to create one')
+
+    def _compare(self, results, baseline, tolerance):
+        self.stdout.write(f'\nCompared with baseline from {baseline.get("timestamp")}:')
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get('cases', {}).get(name)
+            if not before:
+                self.stdout.write(f'  {name:<20} (not in baseline)')
+                continue
+            speed = result['events_per_sec'] / before['events_per_sec'] - 1 if before['events_per_sec'] else 0
+            alloc = result['bytes_per_event'] / before['bytes_per_event'] - 1 if before['bytes_per_event'] else 0
+            flag = ''
+            if speed < -tolerance or alloc > tolerance:
+                regressions.append(name)
+                flag = '  REGRESSION'
+            self.stdout.write(f'  {name:<20} speed {speed:+7.1%}  allocations {alloc:+7.1%}{flag}')
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} case(s) regressed by more than {tolerance:.0%}: {", ".join(regressions)}'
+            )
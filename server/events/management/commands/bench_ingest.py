@@ -0,0 +1,318 @@
+import json
+import logging
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from events import jsoncodec, spool
+from events.fake_traffic import (
+    random_event_source_url,
+    random_fbclid,
+    random_hashed_user,
+    random_products,
+    random_rdt_cid,
+    random_ttclid,
+    random_user_agent,
+)
+from events.management.commands.generate_traffic import pick_event_name
+from events.management.commands.mock_platforms import MockPlatforms, MockServer
+from events.stats import percentile
+
+# Settings that change how /api/event behaves; recorded with every result.
+RECORDED_SETTINGS = (
+    'EVENT_DISPATCH_MODE', 'EVENT_DISPATCH_WORKERS', 'EVENT_DELIVERY_MODE', 'EVENT_BATCHING',
+    'EVENT_DEADLINE_MS', 'EVENT_DEDUP', 'EVENT_DEDUP_BACKEND', 'HTTP_POOL_SIZE', 'EVENT_STORE_PATH',
+    'JSON_CODEC',
+)
+
+# Files an in-process run must not share with the real server: synthetic
+# failures would be redriven to the real pixels by redrive_events, and
+# bench counters and log entries would mix with production ones.
+ISOLATED_SETTINGS = {'EVENT_DEADLETTER_PATH': '', 'METRICS_PATH': '', 'EVENT_STORE_PATH': ''}
+
+
+def request_body(event_name):
+    """A /api/event body shaped like the one src/lib/trackEvent.js sends."""
+    user = random_hashed_user()
+    products = random_products()
+    body = {
+        'event_name': event_name,
+        'event_id': str(uuid.uuid4()),
+        'event_source_url': random_event_source_url(event_name, products),
+        'user_data': {
+            'client_user_agent': random_user_agent(),
+            'em': [user['em']],
+            'ph': [user['ph']],
+        },
+        'custom_data': {
+            'content_type': 'product',
+            'content_ids': [str(p['id']) for p in products],
+            'content_names': [p['name'] for p in products],
+            'currency': 'USD',
+            'value': round(sum(p['price'] for p in products), 2),
+        },
+    }
+    if event_name != 'Lead':
+        body['user_data']['fbc'] = random_fbclid()
+        body['user_data']['ttclid'] = random_ttclid()
+        body['click_id'] = random_rdt_cid()
+    return body
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Load test /api/event at a fixed concurrency and report throughput and tail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Number of clients sending requests back to back (default: 8)',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Seconds to measure for, after warm-up (default: 10)',
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=1.0,
+            help='Seconds of traffic to send before measuring (default: 1)',
+        )
+        parser.add_argument(
+            '--url', default='',
+            help='Benchmark a running server at this base URL instead of the in-process app; '
+                 'its platform hosts are then up to its own settings',
+        )
+        parser.add_argument(
+            '--latency-ms', type=float, default=50.0,
+            help='Stub platform latency for the in-process run (default: 50)',
+        )
+        parser.add_argument(
+            '--latency-dist', choices=('fixed', 'uniform', 'exponential', 'lognormal'), default='lognormal',
+            help='Stub platform latency distribution (default: lognormal)',
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Fraction of stub platform calls answered with 503 (default: 0)',
+        )
+        parser.add_argument(
+            '--output', default='',
+            help='Write the result JSON here (default: bench_results/ingest-<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--compare', default='',
+            help='Earlier result JSON to compare this run against',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Random seed for event names, users and products (event ids stay unique)',
+        )
+
+    def _start_stub(self, options):
+        mock = MockPlatforms(
+            latency_ms=options['latency_ms'],
+            latency_dist=options['latency_dist'],
+            latency_sigma=0.5,
+            error_rate=options['error_rate'],
+            throttle_rate=0.0,
+            rate_limit=0.0,
+            seed=options['seed'],
+        )
+        server = MockServer(('127.0.0.1', 0), mock)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def _client_loop(self, send, stop_at, measure_from, samples, statuses):
+        while time.perf_counter() < stop_at:
+            body = jsoncodec.dumps(request_body(pick_event_name()))
+            started = time.perf_counter()
+            try:
+                status = send(body)
+            except Exception as e:
+                status = type(e).__name__
+            finished = time.perf_counter()
+            if started >= measure_from:
+                samples.append(finished - started)
+                statuses[status] += 1
+
+    def _run(self, make_sender, concurrency, warmup, duration):
+        start = time.perf_counter()
+        measure_from = start + warmup
+        stop_at = measure_from + duration
+        per_client = [([], Counter()) for _ in range(concurrency)]
+        threads = [
+            threading.Thread(
+                target=self._client_loop, args=(make_sender(), stop_at, measure_from, samples, statuses),
+            )
+            for samples, statuses in per_client
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        samples = []
+        statuses = Counter()
+        for client_samples, client_statuses in per_client:
+            samples.extend(client_samples)
+            statuses.update(client_statuses)
+        return samples, statuses
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+
+        if options['url']:
+            target = options['url'].rstrip('/') + '/api/event'
+
+            def make_sender():
+                session = requests.Session()
+                return lambda body: session.post(
+                    target, data=body, headers={'Content-Type': 'application/json'}, timeout=30,
+                ).status_code
+            overrides = {}
+            scratch = None
+        else:
+            stub = self._start_stub(options)
+            stub_url = f'http://127.0.0.1:{stub.server_port}'
+            target = 'in-process /api/event'
+            scratch = tempfile.TemporaryDirectory(prefix='bench_ingest-')
+
+            def make_sender():
+                client = Client(raise_request_exception=False)
+                return lambda body: client.post(
+                    '/api/event', data=body, content_type='application/json',
+                ).status_code
+            overrides = {
+                'META_API_BASE_URL': stub_url,
+                'TIKTOK_API_BASE_URL': stub_url,
+                'REDDIT_API_BASE_URL': stub_url,
+                'META_ACCESS_TOKEN': settings.META_ACCESS_TOKEN or 'bench',
+                'TIKTOK_ACCESS_TOKEN': settings.TIKTOK_ACCESS_TOKEN or 'bench',
+                'REDDIT_ACCESS_TOKEN': settings.REDDIT_ACCESS_TOKEN or 'bench',
+                **ISOLATED_SETTINGS,
+                # Spool and dedup files are part of what is measured, so they
+                # move to a scratch directory instead of being turned off.
+                'EVENT_SPOOL_PATH': str(Path(scratch.name) / 'event_spool.sqlite3'),
+                'EVENT_DEDUP_PATH': str(Path(scratch.name) / 'event_dedup.sqlite3'),
+            }
+
+        self.stdout.write(
+            f'Benchmarking {target}: concurrency={concurrency}, duration={options["duration"]}s, '
+            f'warmup={options["warmup"]}s'
+            + ('' if options['url'] else f', stub latency {options["latency_dist"]} ~{options["latency_ms"]:g}ms')
+        )
+
+        # Per-delivery log lines would swamp the report; failures still show.
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(**overrides):
+                recorded = {name: getattr(settings, name) for name in RECORDED_SETTINGS}
+                try:
+                    samples, statuses = self._run(make_sender, concurrency, options['warmup'], options['duration'])
+                finally:
+                    # An async-mode dispatcher would otherwise keep delivering
+                    # with the real settings once the overrides are undone.
+                    spool.stop_dispatcher()
+        finally:
+            logging.disable(logging.NOTSET)
+            if not options['url']:
+                stub.shutdown()
+                stub.server_close()
+                scratch.cleanup()
+
+        result = self._result(options, concurrency, samples, statuses, recorded)
+        if not options['url']:
+            # Every platform call the stub answered, retries and warm-up included.
+            platform_calls = {}
+            for (platform, status), n in sorted(stub.mock.snapshot().items()):
+                platform_calls.setdefault(platform, {})[str(status)] = n
+            result['platform_calls'] = platform_calls
+        self._report(result)
+        if options['compare']:
+            self._compare(result, json.loads(Path(options['compare']).read_text()))
+
+        output = Path(options['output'] or (
+            settings.BASE_DIR / 'bench_results' / f'ingest-{datetime.now():%Y%m%d-%H%M%S}.json'
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2) + '\n')
+        self.stdout.write(f'Result written to {output}')
+
+    def _result(self, options, concurrency, samples, statuses, recorded):
+        values = sorted(samples)
+        total = len(values)
+        errors = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 400)
+        return {
+            'benchmark': 'ingest',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'config': {
+                'target': options['url'] or 'in-process',
+                'concurrency': concurrency,
+                'duration_s': options['duration'],
+                'warmup_s': options['warmup'],
+                'stub_latency_ms': None if options['url'] else options['latency_ms'],
+                'stub_latency_dist': None if options['url'] else options['latency_dist'],
+                'stub_error_rate': None if options['url'] else options['error_rate'],
+                'seed': options['seed'],
+            },
+            'settings': recorded,
+            'requests': total,
+            'rps': round(total / options['duration'], 2) if options['duration'] else None,
+            'latency_ms': {
+                'mean': round(sum(values) / total * 1000, 2) if total else None,
+                'p50': round(percentile(values, 50) * 1000, 2),
+                'p95': round(percentile(values, 95) * 1000, 2),
+                'p99': round(percentile(values, 99) * 1000, 2),
+                'max': round(values[-1] * 1000, 2) if total else None,
+            },
+            'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+            'error_rate': round(errors / total, 4) if total else None,
+        }
+
+    def _report(self, result):
+        latency = result['latency_ms']
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{result["requests"]} requests, {result["rps"]} req/s, error rate {result["error_rate"]}'
+        ))
+        self.stdout.write(
+            f'  latency: mean={latency["mean"]}ms p50={latency["p50"]}ms p95={latency["p95"]}ms '
+            f'p99={latency["p99"]}ms max={latency["max"]}ms'
+        )
+        self.stdout.write(f'  statuses: {result["statuses"]}')
+        for platform, statuses in result.get('platform_calls', {}).items():
+            self.stdout.write(f'  {platform} calls: {statuses}')
+
+    def _compare(self, result, baseline):
+        self.stdout.write(f'Compared with {baseline.get("timestamp")} ({baseline.get("git_commit")}):')
+        pairs = [('rps', result['rps'], baseline.get('rps'))]
+        pairs += [
+            (f'{name} ms', result['latency_ms'][name], baseline.get('latency_ms', {}).get(name))
+            for name in ('p50', 'p95', 'p99')
+        ]
+        pairs.append(('error rate', result['error_rate'], baseline.get('error_rate')))
+        for label, now, before in pairs:
+            if now is None or not before:
+                self.stdout.write(f'  {label}: {now} (was {before})')
+            else:
+                self.stdout.write(f'  {label}: {now} (was {before}, {(now - before) / before:+.1%})')
@@ -1,237 +1,40 @@
-import copy
-import hashlib
-import json
+import multiprocessing
 import random
 import time
 import uuid
-from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 
-import requests as http_requests
+import django
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from events.corpus import write_events
 from events.fake_traffic import (
+    iter_event_batches,
+    pick_event_name,
     random_event_source_url,
     random_fbclid,
     random_ip,
     random_products,
     random_rdt_cid,
+    random_hashed_user,
     random_ttclid,
-    random_user,
     random_user_agent,
 )
-from events.views import _append_log
-
-META_GRAPH_API_URL = 'https://graph.facebook.com/v24.0/{pixel_id}/events'
-TIKTOK_EVENTS_API_URL = 'https://business-api.tiktok.com/open_api/v1.3/pixel/track/'
-REDDIT_CAPI_URL = 'https://ads-api.reddit.com/api/v3/pixels/{pixel_id}/conversion_events'
-
-EVENT_MAP = {
-    'ViewContent': {'meta': 'ViewContent', 'tiktok': 'ViewContent', 'reddit': 'ViewContent'},
-    'AddToCart':   {'meta': 'AddToCart',   'tiktok': 'AddToCart',   'reddit': 'AddToCart'},
-    'Purchase':    {'meta': 'Purchase',    'tiktok': 'CompletePayment', 'reddit': 'Purchase'},
-    'Lead':        {'meta': 'Lead',        'tiktok': 'SubmitForm',     'reddit': 'Lead'},
-}
-
-REDDIT_TRACKING_TYPE = {
-    'ViewContent': 'VIEW_CONTENT',
-    'AddToCart':   'ADD_TO_CART',
-    'Purchase':    'PURCHASE',
-    'Lead':        'LEAD',
-    'PageVisit':   'PAGE_VISIT',
-    'Search':      'SEARCH',
-    'SignUp':      'SIGN_UP',
-    'AddToWishlist': 'ADD_TO_WISHLIST',
-}
-
-
-def platform_event_name(event_name, platform):
-    entry = EVENT_MAP.get(event_name, {})
-    return entry.get(platform, event_name)
-
-EVENT_WEIGHTS = [
-    ('ViewContent', 40),
-    ('AddToCart', 25),
-    ('Purchase', 20),
-    ('Lead', 15),
-]
-EVENT_NAMES = [name for name, _ in EVENT_WEIGHTS]
-EVENT_CUMULATIVE = []
-_total = 0
-for _name, _weight in EVENT_WEIGHTS:
-    _total += _weight
-    EVENT_CUMULATIVE.append(_total)
+from events import resilience, tracing
+from events.platforms import BUILDERS, PLATFORMS, POSTERS, is_enabled, pixel_id
+from events.ratelimit import TokenBucket
+from events.stats import latency_summary
+from events.views import _append_log, deliver_events
 
 from events.fake_traffic import PRODUCTS as _ALL_PRODUCTS
 PRODUCT_NAME_MAP = {str(p['id']): p['name'] for p in _ALL_PRODUCTS}
 
 
-def pick_event_name():
-    r = random.randint(1, EVENT_CUMULATIVE[-1])
-    for i, threshold in enumerate(EVENT_CUMULATIVE):
-        if r <= threshold:
-            return EVENT_NAMES[i]
-    return EVENT_NAMES[-1]
-
-
-def _send_to_tiktok(event_data, products):
-    if not settings.TIKTOK_ACCESS_TOKEN:
-        return None, None
-
-    event_name = event_data['event_name']
-    tt_event = platform_event_name(event_name, 'tiktok')
-    user_data = event_data.get('user_data', {})
-    custom_data = event_data.get('custom_data', {})
-
-    contents = [
-        {
-            'content_id': str(p['id']),
-            'content_type': 'product',
-            'content_name': p['name'],
-        }
-        for p in products
-    ]
-
-    tt_user = {}
-    em_list = user_data.get('em', [])
-    if em_list:
-        tt_user['email'] = em_list[0] if isinstance(em_list, list) else em_list
-    ph_list = user_data.get('ph', [])
-    if ph_list:
-        tt_user['phone_number'] = ph_list[0] if isinstance(ph_list, list) else ph_list
-    ttclid = user_data.get('ttclid')
-    if ttclid:
-        tt_user['ttclid'] = ttclid
-
-    tt_context = {
-        'user_agent': user_data.get('client_user_agent', ''),
-        'ip': user_data.get('client_ip_address', ''),
-        'page': {
-            'url': event_data.get('event_source_url', ''),
-        },
-    }
-    if tt_user:
-        tt_context['user'] = tt_user
-
-    tt_payload = {
-        'pixel_code': settings.TIKTOK_PIXEL_ID,
-        'event': tt_event,
-        'event_id': event_data.get('event_id', ''),
-        'timestamp': datetime.fromtimestamp(
-            event_data.get('event_time', int(time.time())), tz=timezone.utc
-        ).strftime('%Y-%m-%dT%H:%M:%S%z'),
-        'context': tt_context,
-        'properties': {
-            'contents': contents,
-            'currency': custom_data.get('currency', 'USD'),
-            'value': custom_data.get('value', 0),
-        },
-    }
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Token': settings.TIKTOK_ACCESS_TOKEN,
-    }
-
-    try:
-        resp = http_requests.post(TIKTOK_EVENTS_API_URL, json=tt_payload, headers=headers, timeout=10)
-        result = resp.json()
-        return resp.status_code, result
-    except Exception as e:
-        return 500, {'error': str(e)}
-
-
-def _send_to_reddit(event_data, products):
-    """Send conversion event to Reddit CAPI v3."""
-    if not settings.REDDIT_ACCESS_TOKEN:
-        return None, None
-
-    event_name = event_data['event_name']
-    tracking_type = REDDIT_TRACKING_TYPE.get(event_name)
-    if not tracking_type:
-        return None, None
-
-    user_data = event_data.get('user_data', {})
-    custom_data = event_data.get('custom_data', {})
-
-    event_time = event_data.get('event_time', int(time.time()))
-    event_at_ms = event_time * 1000
-
-    reddit_event = {
-        'event_at': event_at_ms,
-        'action_source': 'WEBSITE',
-        'type': {
-            'tracking_type': tracking_type,
-        },
-    }
-
-    event_source_url = event_data.get('event_source_url')
-    if event_source_url:
-        reddit_event['event_source_url'] = event_source_url
-
-    click_id = event_data.get('click_id')
-    if click_id:
-        reddit_event['click_id'] = click_id
-
-    metadata = {}
-    event_id = event_data.get('event_id')
-    if event_id:
-        metadata['conversion_id'] = event_id
-    if custom_data.get('value') is not None:
-        metadata['value'] = round(custom_data['value'], 2)
-    if custom_data.get('currency'):
-        metadata['currency'] = custom_data['currency']
-    rdt_products = [
-        {
-            'id': str(p['id']),
-            'name': p['name'],
-            'category': 'product',
-        }
-        for p in products
-    ]
-    if rdt_products:
-        metadata['products'] = rdt_products
-        metadata['item_count'] = len(rdt_products)
-    if metadata:
-        reddit_event['metadata'] = metadata
-
-    user = {}
-    email_list = user_data.get('em', [])
-    if email_list:
-        user['email'] = email_list[0] if isinstance(email_list, list) else email_list
-    phone_list = user_data.get('ph', [])
-    if phone_list:
-        user['phone_number'] = phone_list[0] if isinstance(phone_list, list) else phone_list
-    ip = user_data.get('client_ip_address')
-    if ip:
-        user['ip_address'] = hashlib.sha256(ip.encode()).hexdigest()
-    ua = user_data.get('client_user_agent')
-    if ua:
-        user['user_agent'] = ua
-    if user:
-        reddit_event['user'] = user
-
-    url = REDDIT_CAPI_URL.format(pixel_id=settings.REDDIT_PIXEL_ID)
-    payload = {
-        'data': {
-            'events': [reddit_event],
-        },
-    }
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {settings.REDDIT_ACCESS_TOKEN}',
-    }
-
-    try:
-        resp = http_requests.post(url, json=payload, headers=headers, timeout=10)
-        result = resp.json()
-        return resp.status_code, result
-    except Exception as e:
-        return 500, {'error': str(e)}
-
-
 class Command(BaseCommand):
     help = 'Generate synthetic traffic for Meta CAPI, TikTok Events API, and Reddit CAPI'
+    # `source` recorded in the event log for what this command sends.
+    log_source = 'generate_traffic'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -242,140 +45,343 @@ class Command(BaseCommand):
             '--dry-run', action='store_true',
             help='Build payloads but do not POST to APIs',
         )
+        parser.add_argument(
+            '--batch-size', type=int, default=1,
+            help='Send events in batches of this size per platform (default: 1, unbatched)',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of deliveries in flight at once (default: 1)',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=10.0,
+            help='Maximum events per second, token-bucket paced; 0 for unlimited. With --output, '
+                 'the rate the recorded event_time values are spaced at (default: 10)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Split --count across this many processes (default: 1)',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Base random seed; each worker derives its own seed from it',
+        )
+        parser.add_argument(
+            '--output', default='',
+            help='Write the events to this NDJSON file (gzipped if it ends in .gz) instead of sending them; '
+                 'replay it with replay_traffic',
+        )
+        parser.add_argument(
+            '--start-time', type=int, default=None,
+            help='With --output, event_time of the first event in unix seconds (default: now); '
+                 'with --seed, makes the file reproducible',
+        )
 
-    def handle(self, *args, **options):
-        count = options['count']
-        dry_run = options['dry_run']
+    def _record(self, index, count, event_data, results, label=''):
+        """Log one delivered event and echo its outcome; returns False if Meta failed."""
+        event_name = event_data['event_name']
+        event_id = event_data['event_id']
+        meta_status, meta_result = results['meta']
+        tt_status, tt_result = results['tiktok']
+        rdt_status, rdt_result = results['reddit']
+
+        log_entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'event_name': event_name,
+            'event_id': event_id,
+            'payload_sent': event_data,
+            'meta_status_code': meta_status,
+            'meta_response': meta_result,
+            'source': self.log_source,
+        }
+        if tt_status is not None:
+            log_entry['tiktok_status_code'] = tt_status
+            log_entry['tiktok_response'] = tt_result
+        if rdt_status is not None:
+            log_entry['reddit_status_code'] = rdt_status
+            log_entry['reddit_response'] = rdt_result
+        _append_log(log_entry)
+
+        position = f'{index}/{count}' if count else index
+        if meta_status != 200:
+            self.stderr.write(f'  {label}[{position}] {event_name} META FAILED {meta_status}: {meta_result}')
+            return False
+        if not self._verbosity:
+            return True
+        tt_info = ''
+        if tt_status is not None:
+            tt_info = f' | TT:{tt_status}'
+        rdt_info = ''
+        if rdt_status is not None:
+            rdt_info = f' | RDT:{rdt_status}'
+        self.stdout.write(f'  {label}[{position}] {event_name} OK id={event_id[:8]}...{tt_info}{rdt_info}')
+        return True
+
+    def _build_event(self, event_name):
+        user = random_hashed_user()
+        products = random_products()
+        # Drawn from `random` so a seeded run reproduces the same ids.
+        event_id = str(uuid.UUID(int=random.getrandbits(128), version=4))
+
+        hashed_em = user['em']
+        hashed_ph = user['ph']
+
+        user_data = {
+            'client_user_agent': random_user_agent(),
+            'client_ip_address': random_ip(),
+        }
 
-        if not settings.META_ACCESS_TOKEN:
-            self.stderr.write(self.style.ERROR('META_ACCESS_TOKEN is not set'))
-            return
+        event_data = {
+            'event_name': event_name,
+            'event_time': int(time.time()),
+            'event_id': event_id,
+            'action_source': 'website',
+            'event_source_url': random_event_source_url(event_name, products),
+            'user_data': user_data,
+            'custom_data': {
+                'content_type': 'product',
+                'content_ids': [str(p['id']) for p in products],
+                'content_names': [p['name'] for p in products],
+                'currency': 'USD',
+                'value': round(sum(p['price'] for p in products), 2),
+            },
+        }
+
+        if event_name == 'Purchase':
+            user_data['em'] = [hashed_em]
+            user_data['ph'] = [hashed_ph]
+            user_data['fbc'] = random_fbclid()
+            user_data['ttclid'] = random_ttclid()
+            event_data['click_id'] = random_rdt_cid()
+
+        elif event_name == 'AddToCart':
+            user_data['em'] = [hashed_em]
+            user_data['ph'] = [hashed_ph]
+
+        elif event_name == 'Lead':
+            pass
+
+        else:
+            user_data['em'] = [hashed_em]
+            user_data['ph'] = [hashed_ph]
+            user_data['fbc'] = random_fbclid()
+            user_data['ttclid'] = random_ttclid()
+            event_data['click_id'] = random_rdt_cid()
+
+        return event_data
+
+    def _deliver_one(self, event_data):
+        """Send one event to each platform; returns (results, seconds per phase)."""
+        results = {}
+        with tracing.trace('generate_traffic') as current:
+            for platform in PLATFORMS:
+                if not is_enabled(platform):
+                    results[platform] = (None, None)
+                    continue
+                with tracing.span(f'{platform}_build'):
+                    unit = BUILDERS[platform](event_data)
+                if unit is None:
+                    results[platform] = (None, None)
+                    continue
+                with tracing.span(f'{platform}_post'):
+                    results[platform] = resilience.call(platform, POSTERS[platform], [unit], pixel_id(platform))
+        tracing.maybe_write(current, event_name=event_data['event_name'])
+        return [results], current.durations()
+
+    def _deliver_batch(self, batch):
+        """Send a list of events through the shared micro-batcher."""
+        with tracing.trace('generate_traffic') as current:
+            with tracing.span('batch'):
+                all_results = deliver_events([event_data for _, event_data in batch], batched=True)
+        tracing.maybe_write(current, batch_size=len(batch))
+        return all_results, current.durations()
+
+    def _generate(self, count, options, label=''):
+        """Build and send `count` events; returns counters, errors and per-phase timings."""
+        latencies = {}
+
+        def events():
+            for _ in range(count):
+                event_name = pick_event_name()
+                started = time.perf_counter()
+                event_data = self._build_event(event_name)
+                latencies.setdefault('generate', []).append(time.perf_counter() - started)
+                yield event_data
+
+        return self._send_events(events(), count, options, label, latencies)
+
+    def _send_events(self, events, count, options, label='', latencies=None):
+        """Send every event from the iterable `events`; returns counters, errors and per-phase timings.
+
+        `count` is only used to label progress lines and may be None.
+        """
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        concurrency = max(1, options['concurrency'])
+        bucket = TokenBucket(options['rate'])
+        self._verbosity = options.get('verbosity', 1)
 
-        meta_url = META_GRAPH_API_URL.format(pixel_id=settings.META_PIXEL_ID)
         counters = {'ViewContent': 0, 'AddToCart': 0, 'Purchase': 0, 'Lead': 0}
         errors = 0
-
-        self.stdout.write(f'Generating {count} synthetic events (dry_run={dry_run})...')
-
-        for i in range(count):
-            event_name = pick_event_name()
-            counters[event_name] = counters.get(event_name, 0) + 1
-
-            user = random_user()
-            products = random_products()
-            event_id = str(uuid.uuid4())
-
-            hashed_em = hashlib.sha256(user['email'].lower().strip().encode()).hexdigest()
-            hashed_ph = hashlib.sha256(user['phone'].strip().encode()).hexdigest()
-
-            user_data = {
-                'client_user_agent': random_user_agent(),
-                'client_ip_address': random_ip(),
-            }
-
-            event_data = {
-                'event_name': event_name,
-                'event_time': int(time.time()),
-                'event_id': event_id,
-                'action_source': 'website',
-                'event_source_url': random_event_source_url(event_name, products),
-                'user_data': user_data,
-                'custom_data': {
-                    'content_type': 'product',
-                    'content_ids': [str(p['id']) for p in products],
-                    'content_names': [p['name'] for p in products],
-                    'currency': 'USD',
-                    'value': round(sum(p['price'] for p in products), 2),
-                },
-            }
-
-            if event_name == 'Purchase':
-                user_data['em'] = [hashed_em]
-                user_data['ph'] = [hashed_ph]
-                user_data['fbc'] = random_fbclid()
-                user_data['ttclid'] = random_ttclid()
-                event_data['click_id'] = random_rdt_cid()
-
-            elif event_name == 'AddToCart':
-                user_data['em'] = [hashed_em]
-                user_data['ph'] = [hashed_ph]
-
-            elif event_name == 'Lead':
-                pass
-
+        latencies = {} if latencies is None else latencies
+        pending = set()
+        batch = []
+
+        def collect(futures):
+            nonlocal errors
+            for future in futures:
+                sent, all_results, timings = future.result()
+                for (index, event_data), results in zip(sent, all_results):
+                    if not self._record(index, count, event_data, results, label):
+                        errors += 1
+                for phase, seconds in timings.items():
+                    latencies.setdefault(phase, []).append(seconds)
+
+        def send(sent):
+            if batch_size > 1:
+                all_results, timings = self._deliver_batch(sent)
             else:
-                user_data['em'] = [hashed_em]
-                user_data['ph'] = [hashed_ph]
-                user_data['fbc'] = random_fbclid()
-                user_data['ttclid'] = random_ttclid()
-                event_data['click_id'] = random_rdt_cid()
-
-            if dry_run:
-                self.stdout.write(f'  [{i+1}/{count}] {event_name} (dry-run) id={event_id[:8]}...')
-                continue
-
-            # --- Meta CAPI (strip em/ph — no PII to Meta, keep fbc) ---
-            meta_sanitized = copy.deepcopy(event_data)
-            meta_sanitized.pop('click_id', None)
-            meta_ud = meta_sanitized.get('user_data', {})
-            for pii_key in ('em', 'ph', 'email', 'phone', 'ttclid'):
-                meta_ud.pop(pii_key, None)
-            meta_payload = {
-                'data': json.dumps([meta_sanitized]),
-                'access_token': settings.META_ACCESS_TOKEN,
-            }
-
-            meta_ok = True
-            try:
-                resp = http_requests.post(meta_url, data=meta_payload, timeout=10)
-                meta_result = resp.json()
-                meta_status = resp.status_code
-                if meta_status != 200:
-                    meta_ok = False
-            except Exception as e:
-                meta_status = 500
-                meta_result = {'error': str(e)}
-                meta_ok = False
-
-            # --- TikTok Events API ---
-            tt_status, tt_result = _send_to_tiktok(event_data, products)
-
-            # --- Reddit Conversions API ---
-            rdt_status, rdt_result = _send_to_reddit(event_data, products)
-
-            log_entry = {
-                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
-                'event_name': event_name,
-                'event_id': event_id,
-                'payload_sent': event_data,
-                'meta_status_code': meta_status,
-                'meta_response': meta_result,
-                'source': 'generate_traffic',
-            }
-            if tt_status is not None:
-                log_entry['tiktok_status_code'] = tt_status
-                log_entry['tiktok_response'] = tt_result
-            if rdt_status is not None:
-                log_entry['reddit_status_code'] = rdt_status
-                log_entry['reddit_response'] = rdt_result
-            _append_log(log_entry)
-
-            if not meta_ok:
-                errors += 1
-                self.stderr.write(f'  [{i+1}/{count}] {event_name} META FAILED {meta_status}: {meta_result}')
-            else:
-                tt_info = ''
-                if tt_status is not None:
-                    tt_info = f' | TT:{tt_status}'
-                rdt_info = ''
-                if rdt_status is not None:
-                    rdt_info = f' | RDT:{rdt_status}'
-                self.stdout.write(f'  [{i+1}/{count}] {event_name} OK id={event_id[:8]}...{tt_info}{rdt_info}')
+                _, event_data = sent[0]
+                all_results, timings = self._deliver_one(event_data)
+            return sent, all_results, timings
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for i, event_data in enumerate(events):
+                event_name = event_data['event_name']
+                counters[event_name] = counters.get(event_name, 0) + 1
+
+                if dry_run:
+                    for platform in PLATFORMS:
+                        if is_enabled(platform):
+                            started = time.perf_counter()
+                            BUILDERS[platform](event_data)
+                            latencies.setdefault(f'{platform}_build', []).append(time.perf_counter() - started)
+                    if self._verbosity:
+                        position = f'{i+1}/{count}' if count else i + 1
+                        self.stdout.write(f'  {label}[{position}] {event_name} (dry-run) id={event_data["event_id"][:8]}...')
+                    continue
+
+                bucket.acquire()
+                batch.append((i + 1, event_data))
+                if len(batch) < batch_size and (count is None or i < count - 1):
+                    continue
+
+                if len(pending) >= concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(send, batch))
+                batch = []
+
+            if batch:
+                pending.add(executor.submit(send, batch))
+            collect(wait(pending).done)
+
+        return {'counters': counters, 'errors': errors, 'latencies': latencies}
+
+    def _write_output(self, options):
+        count = options['count']
+        path = options['output']
+        start_time = options['start_time'] if options['start_time'] is not None else int(time.time())
+        rate = options['rate']
+        seed = options['seed']
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+
+        def spaced(batches):
+            i = 0
+            for batch in batches:
+                if rate > 0:
+                    for event_data in batch:
+                        event_data['event_time'] = start_time + int(i / rate)
+                        i += 1
+                yield batch
+
+        self.stdout.write(
+            f'Writing {count} synthetic events to {path} (seed={seed}, '
+            f'rate={rate or "unspaced"}, start_time={start_time})...'
+        )
+        started = time.perf_counter()
+        written = write_events(path, spaced(iter_event_batches(count, seed, start_time)))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} events in {elapsed:.2f}s ({written / elapsed:,.0f} events/s)' if elapsed > 0
+            else f'Wrote {written} events'
+        ))
 
-            if i < count - 1:
-                time.sleep(0.1)
+    def _summarize(self, shards, count, elapsed, dry_run):
+        counters = {}
+        errors = 0
+        latencies = {}
+        for shard in shards:
+            for name, value in shard['counters'].items():
+                counters[name] = counters.get(name, 0) + value
+            errors += shard['errors']
+            for phase, samples in shard['latencies'].items():
+                latencies.setdefault(phase, []).extend(samples)
 
         summary_parts = [f'{v} {k}' for k, v in counters.items() if v > 0]
         self.stdout.write(self.style.SUCCESS(
             f'\nDone. Sent {count} events ({", ".join(summary_parts)}). Errors: {errors}'
         ))
+        if not dry_run and elapsed > 0:
+            self.stdout.write(f'Throughput: {count / elapsed:.1f} events/s over {elapsed:.2f}s')
+        if dry_run:
+            # Generation plus payload building only; console output is excluded.
+            build_seconds = sum(sum(samples) for samples in latencies.values())
+            if build_seconds > 0:
+                self.stdout.write(f'Build throughput: {count / build_seconds:,.0f} events/s')
+        if latencies:
+            # Same phase names as the Server-Timing header of /api/event.
+            self.stdout.write('Timing breakdown:')
+            for phase, samples in latencies.items():
+                self.stdout.write(f'  {phase}: {latency_summary(samples)}')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            self._write_output(options)
+            return
+
+        count = options['count']
+        dry_run = options['dry_run']
+        workers = max(1, min(options['workers'], count))
+
+        if not settings.META_ACCESS_TOKEN:
+            self.stderr.write(self.style.ERROR('META_ACCESS_TOKEN is not set'))
+            return
+
+        base_seed = options['seed']
+        if base_seed is None:
+            base_seed = random.SystemRandom().getrandbits(32)
+        seed_source = random.Random(base_seed)
+        seeds = [seed_source.getrandbits(64) for _ in range(workers)]
+
+        self.stdout.write(
+            f'Generating {count} synthetic events (dry_run={dry_run}, workers={workers}, '
+            f'concurrency={options["concurrency"]}, rate={options["rate"] or "unlimited"}, '
+            f'seed={base_seed})...'
+        )
+
+        started = time.perf_counter()
+        if workers == 1:
+            random.seed(seeds[0])
+            shards = [self._generate(count, options)]
+        else:
+            # Each process gets an even share of the count and of the rate.
+            shard_options = dict(options, rate=options['rate'] / workers)
+            shard_counts = [count // workers + (1 if w < count % workers else 0) for w in range(workers)]
+            # Spawned, not forked: a fork would copy this process's
+            # threads' state (log listener, HTTP pools) but not the threads.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [
+                    pool.submit(_run_shard, w, shard_counts[w], seeds[w], shard_options)
+                    for w in range(workers)
+                ]
+                shards = [future.result() for future in futures]
+        self._summarize(shards, count, time.perf_counter() - started, dry_run)
+
+
+def _run_shard(shard, count, seed, options):
+    """Process-pool entry point: generate one shard with its own seed."""
+    django.setup()
+    random.seed(seed)
+    return Command()._generate(count, options, label=f'w{shard} ')
@@ -0,0 +1,276 @@
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand
+
+from events import jsoncodec
+from events.ratelimit import TokenBucket
+
+MAX_EVENTS_PER_REQUEST = 1000
+
+ROUTES = (
+    ('meta', re.compile(r'^/v[\d.]+/(?P<pixel_id>[^/]+)/events/?$')),
+    ('tiktok', re.compile(r'^/open_api/v[\d.]+/pixel/(?P<kind>track|batch)/?$')),
+    ('reddit', re.compile(r'^/api/v3/pixels/(?P<pixel_id>[^/]+)/conversion_events/?$')),
+)
+
+
+def _check_events(events, required):
+    """Errors for a list of events that must each carry the `required` {key: type} fields."""
+    if not isinstance(events, list) or not events:
+        return ['expected a non-empty list of events']
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        return [f'at most {MAX_EVENTS_PER_REQUEST} events per request']
+    errors = []
+    for i, event in enumerate(events):
+        if not isinstance(event, dict):
+            errors.append(f'event {i}: not an object')
+            continue
+        for key, kind in required.items():
+            if not isinstance(event.get(key), kind):
+                errors.append(f'event {i}: {key} missing or not {kind.__name__}')
+    return errors
+
+
+def validate_meta(headers, body, match):
+    form = parse_qs(body.decode())
+    if not form.get('access_token', [''])[0]:
+        return ['access_token is required'], 0
+    try:
+        events = jsoncodec.loads(form.get('data', [''])[0])
+    except ValueError:
+        return ['data must be a JSON array'], 0
+    errors = _check_events(events, {'event_name': str, 'event_time': int, 'action_source': str, 'user_data': dict})
+    return errors, len(events) if isinstance(events, list) else 0
+
+
+def validate_tiktok(headers, body, match):
+    if not headers.get('Access-Token'):
+        return ['Access-Token header is required'], 0
+    payload = jsoncodec.loads(body)
+    if not payload.get('pixel_code'):
+        return ['pixel_code is required'], 0
+    events = payload.get('batch') if match['kind'] == 'batch' else [payload]
+    errors = _check_events(events, {'event': str, 'timestamp': str, 'context': dict})
+    return errors, len(events) if isinstance(events, list) else 0
+
+
+def validate_reddit(headers, body, match):
+    if not headers.get('Authorization', '').startswith('Bearer '):
+        return ['Authorization: Bearer token is required'], 0
+    events = jsoncodec.loads(body).get('data', {}).get('events')
+    errors = _check_events(events, {'event_at': int, 'action_source': str, 'type': dict})
+    if not errors:
+        errors = [
+            f'event {i}: type.tracking_type is required'
+            for i, event in enumerate(events) if not event['type'].get('tracking_type')
+        ]
+    return errors, len(events) if isinstance(events, list) else 0
+
+
+VALIDATORS = {
+    'meta': validate_meta,
+    'tiktok': validate_tiktok,
+    'reddit': validate_reddit,
+}
+
+
+def success_body(platform, received):
+    if platform == 'meta':
+        return {'events_received': received, 'messages': [], 'fbtrace_id': uuid.uuid4().hex[:12]}
+    if platform == 'tiktok':
+        return {'code': 0, 'message': 'OK', 'request_id': uuid.uuid4().hex, 'data': {}}
+    return {'message': f'Successfully processed {received} conversion events.'}
+
+
+def error_body(platform, status, message):
+    if platform == 'meta':
+        code = 4 if status == 429 else 100 if status == 400 else 2
+        return {'error': {'message': message, 'type': 'OAuthException', 'code': code,
+                          'fbtrace_id': uuid.uuid4().hex[:12]}}
+    if platform == 'tiktok':
+        code = 40100 if status == 429 else 40002 if status == 400 else 50000
+        return {'code': code, 'message': message, 'request_id': uuid.uuid4().hex}
+    return {'message': message}
+
+
+class MockPlatforms:
+    """Response policy shared by all handler threads: latency, injected errors, rate limits."""
+
+    def __init__(self, latency_ms, latency_dist, latency_sigma, error_rate, throttle_rate, rate_limit, seed):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.buckets = {platform: TokenBucket(rate_limit, burst=max(1, int(rate_limit))) for platform in VALIDATORS}
+        self.counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self):
+        ms = self.latency_ms
+        with self._lock:
+            if self.latency_dist == 'uniform':
+                ms = self._random.uniform(0, 2 * ms)
+            elif self.latency_dist == 'exponential':
+                ms = self._random.expovariate(1 / ms) if ms else 0
+            elif self.latency_dist == 'lognormal':
+                ms = ms * self._random.lognormvariate(0, self.latency_sigma)
+        return ms / 1000
+
+    def _roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    def respond(self, platform, headers, body, match):
+        """(status, body dict) for one request."""
+        if not self.buckets[platform].try_acquire() or self._roll(self.throttle_rate):
+            return 429, error_body(platform, 429, 'Too many requests, retry later')
+        if self._roll(self.error_rate):
+            return 503, error_body(platform, 503, 'Service temporarily unavailable')
+        try:
+            errors, received = VALIDATORS[platform](headers, body, match)
+        except (ValueError, AttributeError, TypeError) as e:
+            errors, received = [f'malformed payload: {e}'], 0
+        if errors:
+            return 400, error_body(platform, 400, '; '.join(errors[:5]))
+        return 200, success_body(platform, received)
+
+    def record(self, platform, status):
+        with self._lock:
+            self.counts[(platform, status)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive like the real APIs; headers and body go out as separate
+    # writes, so Nagle would otherwise hold the body for a delayed ACK.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        path = self.path.split('?', 1)[0]
+        for platform, pattern in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            self._send(404, {'error': f'no mock endpoint for {path}'})
+            return
+
+        mock = self.server.mock
+        started = time.perf_counter()
+        status, payload = mock.respond(platform, self.headers, body, match)
+        time.sleep(max(0, mock.latency() - (time.perf_counter() - started)))
+        mock.record(platform, status)
+        self._send(status, payload, retry_after=status == 429)
+
+    def _send(self, status, payload, retry_after=False):
+        data = jsoncodec.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if retry_after:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under load tests.
+    request_queue_size = 1024
+
+    def __init__(self, address, mock):
+        super().__init__(address, Handler)
+        self.mock = mock
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Meta, TikTok and Reddit event APIs (for offline load tests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8900, help='Port (default: 8900)')
+        parser.add_argument(
+            '--latency-ms', type=float, default=50.0,
+            help='Typical response latency in ms: the median for lognormal, the mean otherwise (default: 50)',
+        )
+        parser.add_argument(
+            '--latency-dist', choices=('fixed', 'uniform', 'exponential', 'lognormal'), default='lognormal',
+            help='Latency distribution (default: lognormal)',
+        )
+        parser.add_argument(
+            '--latency-sigma', type=float, default=0.5,
+            help='Shape of the lognormal distribution; larger means a longer tail (default: 0.5)',
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Fraction of requests answered with 503 (default: 0)',
+        )
+        parser.add_argument(
+            '--throttle-rate', type=float, default=0.0,
+            help='Fraction of requests answered with 429 regardless of load (default: 0)',
+        )
+        parser.add_argument(
+            '--rate-limit', type=float, default=0.0,
+            help='Requests per second each platform accepts before answering 429; 0 for unlimited (default: 0)',
+        )
+        parser.add_argument(
+            '--report-interval', type=float, default=10.0,
+            help='Seconds between request-count reports; 0 to disable (default: 10)',
+        )
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for latency and error injection')
+
+    def _report(self, mock, interval):
+        while True:
+            time.sleep(interval)
+            counts = mock.snapshot()
+            if counts:
+                parts = [f'{platform}:{status}={n}' for (platform, status), n in sorted(counts.items())]
+                self.stdout.write(f'  {sum(counts.values()) / interval:.1f} req/s  {" ".join(parts)}')
+
+    def handle(self, *args, **options):
+        mock = MockPlatforms(
+            latency_ms=options['latency_ms'],
+            latency_dist=options['latency_dist'],
+            latency_sigma=options['latency_sigma'],
+            error_rate=options['error_rate'],
+            throttle_rate=options['throttle_rate'],
+            rate_limit=options['rate_limit'],
+            seed=options['seed'],
+        )
+        server = MockServer((options['host'], options['port']), mock)
+
+        base_url = f'http://{options["host"]}:{server.server_port}'
+        self.stdout.write(
+            f'Mock platforms on {base_url} (latency {options["latency_dist"]} ~{options["latency_ms"]:g}ms, '
+            f'errors={options["error_rate"]}, throttle={options["throttle_rate"]}, '
+            f'rate_limit={options["rate_limit"] or "unlimited"})'
+        )
+        self.stdout.write(f'Set META_API_BASE_URL, TIKTOK_API_BASE_URL and REDDIT_API_BASE_URL to {base_url}')
+        if options['report_interval'] > 0:
+            threading.Thread(
+                target=self._report, args=(mock, options['report_interval']), daemon=True,
+            ).start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
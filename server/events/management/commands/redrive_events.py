@@ -0,0 +1,176 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events import deadletter, resilience
+from events.platforms import PLATFORMS, POSTERS, base_url, is_delivered, is_enabled
+from events.ratelimit import TokenBucket
+
+
+def _attempts(result):
+    if isinstance(result, dict):
+        return result.get('attempts', 1)
+    return 1
+
+
+def _outcome_key(status, result):
+    """Status to group failures by; TikTok's 200 rejections show their code too."""
+    if 200 <= status < 300 and isinstance(result, dict):
+        return f'{status} code {result.get("code")}'
+    return str(status)
+
+
+class Command(BaseCommand):
+    help = 'Resend platform events from the dead-letter store in rate-limited batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--platform', action='append', choices=PLATFORMS,
+            help='Only redrive this platform; repeat for several (default: all)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Events per platform request (default: 100)',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=2.0,
+            help='Maximum requests per second to each platform, token-bucket paced; 0 for unlimited (default: 2)',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Stop after this many events per platform; 0 for all (default: 0)',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=0,
+            help='Skip events that have already had this many delivery attempts; 0 for no limit (default: 0)',
+        )
+        parser.add_argument(
+            '--max-age-days', type=float, default=7.0,
+            help='Skip events that failed longer ago than this; platforms reject old events (default: 7)',
+        )
+        parser.add_argument(
+            '--purge-expired', action='store_true',
+            help='Delete the events skipped by --max-age-days instead of leaving them in the store',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be resent without POSTing anything',
+        )
+
+    def _redrive(self, platform, url, pixels, options, failed_since):
+        """Resend one platform's events recorded against `url`; returns its outcome counts."""
+        outcome = {'sent': 0, 'failed': 0, 'rejected': 0, 'statuses': {}, 'stopped': None}
+        bucket = TokenBucket(options['rate'])
+        batch_size = max(1, options['batch_size'])
+        limit = options['limit']
+        for pixel_id in pixels:
+            after_id = 0
+            while True:
+                done = outcome['sent'] + outcome['failed'] + outcome['rejected']
+                remaining = limit - done if limit else batch_size
+                if remaining <= 0:
+                    return outcome
+                rows = deadletter.pending(
+                    platform, url, pixel_id, after_id, min(batch_size, remaining),
+                    failed_since, options['max_attempts'],
+                )
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+                ids = [row_id for row_id, _, _ in rows]
+                if options['dry_run']:
+                    outcome['sent'] += len(rows)
+                    continue
+
+                bucket.acquire()
+                status, result = resilience.call(
+                    platform, POSTERS[platform], [event for _, _, event in rows], pixel_id, dead_letter=False,
+                )
+                if is_delivered(platform, status, result):
+                    deadletter.resolve(ids)
+                    outcome['sent'] += len(rows)
+                    continue
+                key = _outcome_key(status, result)
+                outcome['statuses'][key] = outcome['statuses'].get(key, 0) + len(rows)
+                if not resilience.is_retryable(status):
+                    # Rejected outright (4xx, TikTok error code): resending
+                    # will fail the same way, so drop them.
+                    deadletter.resolve(ids)
+                    outcome['rejected'] += len(rows)
+                    continue
+                deadletter.mark_failed(ids, status, result, _attempts(result))
+                outcome['failed'] += len(rows)
+                # Still down: the rest stay stored for the next run.
+                outcome['stopped'] = f'{status} {deadletter.error_message(result)}'
+                return outcome
+        return outcome
+
+    def _report(self, platform, outcome, dry_run):
+        verb = 'would resend' if dry_run else 'resent'
+        line = f'  {platform}: {verb} {outcome["sent"]}, failed {outcome["failed"]}'
+        if outcome['rejected']:
+            line += f', rejected and dropped {outcome["rejected"]}'
+        if outcome['statuses']:
+            line += ' (' + ', '.join(f'{status}: {n}' for status, n in sorted(outcome['statuses'].items())) + ')'
+        style = self.style.SUCCESS if not outcome['failed'] and not outcome['rejected'] else self.style.ERROR
+        self.stdout.write(style(line))
+        if outcome['stopped']:
+            self.stdout.write(f'    stopped early, platform still failing: {outcome["stopped"]}')
+
+    def handle(self, *args, **options):
+        if not deadletter.enabled():
+            raise CommandError('EVENT_DEADLETTER_PATH is empty; the dead-letter store is disabled')
+        if options['max_age_days'] <= 0:
+            raise CommandError('--max-age-days must be more than 0')
+
+        platforms = options['platform'] or list(PLATFORMS)
+        failed_since = time.time() - options['max_age_days'] * 86400
+        dry_run = options['dry_run']
+        depth = deadletter.depth()
+        self.stdout.write(
+            'Dead-letter store: ' + ', '.join(f'{p}={depth.get(p, 0)}' for p in PLATFORMS)
+            + f' (dry_run={dry_run}, batch_size={options["batch_size"]}, rate={options["rate"] or "unlimited"})'
+        )
+
+        targets = {}
+        for (platform, url, pixel_id), count in deadletter.targets(platforms).items():
+            if url != base_url(platform):
+                # Recorded against another host (e.g. mock_platforms); never
+                # send those events to the one configured now.
+                self.stderr.write(f'  {platform}: {count} events recorded for {url} skipped (now {base_url(platform)})')
+                continue
+            targets.setdefault(platform, []).append(pixel_id)
+        skipped = [p for p in targets if not dry_run and not is_enabled(p)]
+        for platform in skipped:
+            self.stderr.write(f'  {platform}: not configured (no access token), skipped')
+            del targets[platform]
+
+        started = time.perf_counter()
+        outcomes = {}
+        if targets:
+            # One thread per platform: each is paced and stopped independently.
+            with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+                futures = {
+                    platform: executor.submit(self._redrive, platform, base_url(platform), pixels, options, failed_since)
+                    for platform, pixels in targets.items()
+                }
+                outcomes = {platform: future.result() for platform, future in futures.items()}
+        elapsed = time.perf_counter() - started
+
+        if options['purge_expired'] and not dry_run:
+            expired = deadletter.purge(failed_since, platforms)
+            if expired:
+                self.stdout.write(f'  purged {expired} events older than {options["max_age_days"]:g} days')
+
+        if not outcomes:
+            self.stdout.write('Nothing to redrive.')
+            return
+        self.stdout.write('Outcome:')
+        for platform in PLATFORMS:
+            if platform in outcomes:
+                self._report(platform, outcomes[platform], dry_run)
+        total = sum(outcome['sent'] for outcome in outcomes.values())
+        self.stdout.write(f'Done in {elapsed:.2f}s; {sum(deadletter.depth().values())} events left in the store.')
+        if not dry_run and total and elapsed > 0:
+            self.stdout.write(f'Throughput: {total / elapsed:.1f} events/s')
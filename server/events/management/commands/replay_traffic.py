@@ -0,0 +1,123 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from events.corpus import read_events
+from events.management.commands.generate_traffic import Command as GenerateTraffic
+
+# Most events held back while spreading one recorded second evenly; a
+# busier second is sent in bursts of this size instead.
+MAX_SECOND_EVENTS = 10000
+
+
+def _timeline(events):
+    """(seconds after the first event, event) pairs from recorded event_time values.
+
+    event_time has one-second resolution, so events sharing a second are
+    spread evenly across it.
+    """
+    first = None
+    second = None
+    group = []
+
+    def spread():
+        for i, event_data in enumerate(group):
+            yield second - first + i / len(group), event_data
+
+    for event_data in events:
+        event_time = event_data.get('event_time', 0)
+        if first is None:
+            first = event_time
+        if group and (event_time != second or len(group) >= MAX_SECOND_EVENTS):
+            yield from spread()
+            group = []
+        second = event_time
+        group.append(event_data)
+    if group:
+        yield from spread()
+
+
+class Command(GenerateTraffic):
+    help = 'Replay an NDJSON corpus written by generate_traffic --output through the delivery path'
+    log_source = 'replay_traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Corpus file (NDJSON, gzipped if it ends in .gz)')
+        parser.add_argument(
+            '--rate', type=float, default=0.0,
+            help='Maximum events per second, token-bucket paced; 0 for unlimited (default: 0)',
+        )
+        parser.add_argument(
+            '--speedup', type=float, default=0.0,
+            help='Follow the recorded event_time spacing, this many times faster; '
+                 '0 sends as fast as --rate allows (default: 0)',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of deliveries in flight at once (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1,
+            help='Send events in batches of this size per platform (default: 1, unbatched)',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Stop after this many events; 0 for the whole corpus (default: 0)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Read and build payloads but do not POST to APIs',
+        )
+        parser.add_argument(
+            '--keep-event-time', action='store_true',
+            help='Send the recorded event_time instead of the time each event is replayed '
+                 '(platforms reject events more than a few days old)',
+        )
+        parser.add_argument(
+            '--new-event-ids', action='store_true',
+            help='Give every event a fresh event_id, so platforms do not drop repeat replays as duplicates',
+        )
+
+    def _events(self, options):
+        events = read_events(options['path'])
+        speedup = options['speedup']
+        if speedup > 0:
+            events = self._paced(_timeline(events), speedup)
+        for i, event_data in enumerate(events):
+            if options['limit'] and i >= options['limit']:
+                return
+            if not options['keep_event_time']:
+                event_data['event_time'] = int(time.time())
+            if options['new_event_ids']:
+                event_data['event_id'] = str(uuid.uuid4())
+            yield event_data
+
+    def _paced(self, timeline, speedup):
+        started = time.monotonic()
+        for offset, event_data in timeline:
+            delay = started + offset / speedup - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield event_data
+
+    def handle(self, *args, **options):
+        if options['speedup'] < 0:
+            raise CommandError('--speedup must be 0 or more')
+        if not options['dry_run'] and not settings.META_ACCESS_TOKEN:
+            self.stderr.write(self.style.ERROR('META_ACCESS_TOKEN is not set'))
+            return
+
+        self.stdout.write(
+            f'Replaying {options["path"]} (dry_run={options["dry_run"]}, '
+            f'concurrency={options["concurrency"]}, rate={options["rate"] or "unlimited"}, '
+            f'speedup={options["speedup"] or "off"})...'
+        )
+        started = time.perf_counter()
+        try:
+            shard = self._send_events(self._events(options), None, options)
+        except FileNotFoundError as e:
+            raise CommandError(f'Corpus not found: {e.filename}')
+        count = sum(shard['counters'].values())
+        self._summarize([shard], count, time.perf_counter() - started, options['dry_run'])
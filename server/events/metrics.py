@@ -0,0 +1,236 @@
+"""Counters and latency histograms for `/api/metrics` (Prometheus text format).
+
+Each worker process accumulates samples in memory. With METRICS_PATH set,
+it also adds its deltas into a shared SQLite table at most every
+METRICS_FLUSH_SECONDS (and before every scrape), so whichever worker
+answers the scrape reports totals for all gunicorn workers on the box.
+The file records the METRICS_SCOPE (deploy) its totals belong to; the first
+process of a new scope to open it starts them over from zero. Without
+METRICS_PATH, only the answering worker's own samples are shown.
+
+Gauges (spool and dead-letter depth, dedup cache size, dropped log records) are read when
+the endpoint is scraped rather than stored.
+"""
+import asyncio
+import atexit
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help), in the order they are rendered.
+METRICS = {
+    'events_ingest_requests_total': ('counter', 'Ingest requests by path and response status.'),
+    'events_ingest_duration_seconds': ('histogram', 'Time spent handling ingest requests, by path.'),
+    'events_bulk_events_total': ('counter', 'Events received through /api/events by outcome.'),
+    'events_delivery_total': ('counter', 'Platform delivery calls by platform and final status.'),
+    'events_delivery_duration_seconds': ('histogram', 'Platform delivery time, retries included.'),
+    'events_deadletter_total': ('counter', 'Platform events written to the dead-letter store, by platform.'),
+    'events_dedup_checked_total': ('counter', 'Events checked against the dedup cache.'),
+    'events_dedup_duplicates_total': ('counter', 'Events dropped as duplicates.'),
+}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+CREATE TABLE IF NOT EXISTS metrics_scope (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    scope TEXT NOT NULL
+);
+'''
+
+_values = {}
+_pending = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_scope_checked = False
+
+
+def _connect():
+    """The shared table, emptied first if it holds another scope's totals."""
+    global _scope_checked
+    conn = db.connect(settings.METRICS_PATH, _SCHEMA)
+    if not _scope_checked:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT scope FROM metrics_scope').fetchone()
+            if row is None or row[0] != settings.METRICS_SCOPE:
+                conn.execute('DELETE FROM metrics')
+                conn.execute('INSERT OR REPLACE INTO metrics_scope (id, scope) VALUES (1, ?)', (settings.METRICS_SCOPE,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        _scope_checked = True
+    return conn
+
+
+def _add(name, labels, amount):
+    # Caller holds _lock.
+    key = (name, json.dumps(labels))
+    _values[key] = _values.get(key, 0) + amount
+    if settings.METRICS_PATH:
+        _pending[key] = _pending.get(key, 0) + amount
+
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _add(name, labels, amount)
+    _maybe_flush()
+
+
+def observe(name, seconds, **labels):
+    """Record one sample in histogram `name`."""
+    index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        # Smaller buckets get 0 so every bucket series exists from the first sample.
+        for i, le in enumerate(LATENCY_BUCKETS):
+            _add(f'{name}_bucket', dict(labels, le=str(le)), 1 if i >= index else 0)
+        _add(f'{name}_bucket', dict(labels, le='+Inf'), 1)
+        _add(f'{name}_sum', labels, seconds)
+        _add(f'{name}_count', labels, 1)
+    _maybe_flush()
+
+
+def _maybe_flush():
+    global _last_flush
+    if not settings.METRICS_PATH or time.monotonic() - _last_flush < settings.METRICS_FLUSH_SECONDS:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush()
+        return
+    # On an event loop (the ASGI views) the SQLite write runs in a worker
+    # thread; moving _last_flush now keeps it to one scheduled flush.
+    with _lock:
+        _last_flush = time.monotonic()
+    loop.run_in_executor(None, flush)
+
+
+def flush():
+    """Add this process's unflushed deltas into the shared METRICS_PATH table."""
+    global _pending, _last_flush
+    if not settings.METRICS_PATH:
+        return
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(
+            'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+            [(name, labels, value) for (name, labels), value in pending.items()],
+        )
+        conn.execute('COMMIT')
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        logger.warning('metrics flush failed', extra={'error': str(e)})
+        with _lock:
+            for key, value in pending.items():
+                _pending[key] = _pending.get(key, 0) + value
+
+
+atexit.register(flush)
+
+
+def _samples():
+    if not settings.METRICS_PATH:
+        with _lock:
+            return dict(_values)
+    flush()
+    rows = _connect().execute(
+        'SELECT name, labels, value FROM metrics',
+    ).fetchall()
+    return {(name, labels): value for name, labels, value in rows}
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    labels = json.loads(labels)
+    le = labels.pop('le', None)
+    return (
+        sorted(labels.items()),
+        name,
+        float('inf') if le == '+Inf' else float(le or 0),
+    )
+
+
+def _format(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{key}="{label}"' for key, label in labels.items())
+        name = f'{name}{{{pairs}}}'
+    if value == int(value):
+        value = int(value)
+    return f'{name} {value}'
+
+
+def render(gauges=()):
+    """Prometheus exposition text; `gauges` is an iterable of (name, help, labels, value)."""
+    families = {name: [] for name in METRICS}
+    for item in sorted(_samples().items(), key=_sort_key):
+        (name, labels), value = item
+        families.setdefault(_family(name), []).append(_format(name, json.loads(labels), value))
+
+    lines = []
+    for name, samples in families.items():
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+    previous = None
+    for name, help_text, labels, value in gauges:
+        # Consecutive gauges with the same name are one labelled family.
+        if name != previous:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            previous = name
+        lines.append(_format(name, labels, value))
+    return '\n'.join(lines) + '\n'
+
+
+def track_requests(view):
+    """Count `view`'s responses by path and status and observe its duration."""
+    def record(request, start, response):
+        observe('events_ingest_duration_seconds', time.perf_counter() - start, path=request.path)
+        inc('events_ingest_requests_total', path=request.path, status=str(response.status_code))
+        return response
+
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            start = time.perf_counter()
+            return record(request, start, await view(request, *args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        start = time.perf_counter()
+        return record(request, start, view(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,369 @@
+"""Payload adapters for Meta CAPI, TikTok Events API and Reddit CAPI v3.
+
+Every builder turns one canonical event (the dict `send_event` and
+`generate_traffic` produce) into that platform's event in a single pass,
+without copying the input: untouched sub-dicts such as `custom_data` are
+shared with the canonical event, so callers must treat the results as
+read-only. URLs, headers and event-name lookups are cached.
+"""
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from django.conf import settings
+
+from . import jsoncodec
+from .clients import apost, get_session
+from .hashing import hash_identifier
+
+# Endpoint paths; hosts come from the *_API_BASE_URL settings so they can be
+# pointed at `manage.py mock_platforms` for offline testing.
+META_EVENTS_PATH = '/v24.0/{pixel_id}/events'
+TIKTOK_TRACK_PATH = '/open_api/v1.3/pixel/track/'
+TIKTOK_BATCH_PATH = '/open_api/v1.3/pixel/batch/'
+REDDIT_EVENTS_PATH = '/api/v3/pixels/{pixel_id}/conversion_events'
+
+PLATFORMS = ('meta', 'tiktok', 'reddit')
+
+# Per-call timeout in seconds when no tighter deadline applies.
+REQUEST_TIMEOUT = 10
+
+EVENT_MAP = {
+    'ViewContent': {'meta': 'ViewContent', 'tiktok': 'ViewContent', 'reddit': 'ViewContent'},
+    'AddToCart':   {'meta': 'AddToCart',   'tiktok': 'AddToCart',   'reddit': 'AddToCart'},
+    'Purchase':    {'meta': 'Purchase',    'tiktok': 'CompletePayment', 'reddit': 'Purchase'},
+    'Lead':        {'meta': 'Lead',        'tiktok': 'SubmitForm',     'reddit': 'Lead'},
+}
+
+REDDIT_TRACKING_TYPE = {
+    'ViewContent': 'VIEW_CONTENT',
+    'AddToCart':   'ADD_TO_CART',
+    'Purchase':    'PURCHASE',
+    'Lead':        'LEAD',
+    'PageVisit':   'PAGE_VISIT',
+    'Search':      'SEARCH',
+    'SignUp':      'SIGN_UP',
+    'AddToWishlist': 'ADD_TO_WISHLIST',
+}
+
+TIKTOK_EVENT_NAMES = {name: entry['tiktok'] for name, entry in EVENT_MAP.items()}
+
+# Identifiers Meta must not receive server-side; fbc is re-added last.
+META_DROPPED_USER_KEYS = frozenset(('em', 'ph', 'email', 'phone', 'fbc', 'ttclid'))
+
+
+def platform_event_name(event_name, platform):
+    entry = EVENT_MAP.get(event_name, {})
+    return entry.get(platform, event_name)
+
+
+@lru_cache(maxsize=None)
+def _url(base_url, path):
+    return base_url.rstrip('/') + path
+
+
+def meta_url(pixel_id):
+    return _url(settings.META_API_BASE_URL, META_EVENTS_PATH.format(pixel_id=pixel_id))
+
+
+def tiktok_url(batch=False):
+    return _url(settings.TIKTOK_API_BASE_URL, TIKTOK_BATCH_PATH if batch else TIKTOK_TRACK_PATH)
+
+
+def reddit_url(pixel_id):
+    return _url(settings.REDDIT_API_BASE_URL, REDDIT_EVENTS_PATH.format(pixel_id=pixel_id))
+
+
+@lru_cache(maxsize=None)
+def _tiktok_headers(token):
+    return {'Content-Type': 'application/json', 'Access-Token': token}
+
+
+@lru_cache(maxsize=None)
+def _reddit_headers(token):
+    return {'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+
+
+def pixel_id(platform):
+    if platform == 'meta':
+        return settings.META_PIXEL_ID
+    if platform == 'tiktok':
+        return settings.TIKTOK_PIXEL_ID
+    return settings.REDDIT_PIXEL_ID
+
+
+def base_url(platform):
+    if platform == 'meta':
+        return settings.META_API_BASE_URL
+    if platform == 'tiktok':
+        return settings.TIKTOK_API_BASE_URL
+    return settings.REDDIT_API_BASE_URL
+
+
+def is_delivered(platform, status, result):
+    """True when the platform accepted the call.
+
+    TikTok answers many rejections (bad token, invalid events, rate limits)
+    with HTTP 200 and a non-zero `code` in the body.
+    """
+    if status is None or not 200 <= status < 300:
+        return False
+    if platform == 'tiktok':
+        return isinstance(result, dict) and result.get('code', 0) == 0
+    return True
+
+
+def events_received(platform, result):
+    """How many events an accepted batch says the platform took; None when it doesn't say (TikTok, Reddit)."""
+    if platform == 'meta' and isinstance(result, dict):
+        return result.get('events_received')
+    return None
+
+
+def is_enabled(platform):
+    """Meta is always attempted; TikTok and Reddit need an access token."""
+    if platform == 'tiktok':
+        return bool(settings.TIKTOK_ACCESS_TOKEN)
+    if platform == 'reddit':
+        return bool(settings.REDDIT_ACCESS_TOKEN)
+    return True
+
+
+# --- Meta CAPI ---------------------------------------------------------------
+
+def build_meta_event(event_data):
+    """Canonical event minus click_id and PII; keeps fbc."""
+    event = {key: value for key, value in event_data.items() if key != 'click_id'}
+    user_data = event_data.get('user_data')
+    if user_data is not None:
+        ud = {key: value for key, value in user_data.items() if key not in META_DROPPED_USER_KEYS}
+        fbc = user_data.get('fbc')
+        if fbc:
+            ud['fbc'] = fbc
+        event['user_data'] = ud
+    return event
+
+
+def meta_request(events, pixel_id):
+    """(url, request kwargs) for posting `events`; shared by the sync and async clients."""
+    payload = {
+        'data': jsoncodec.dumps_str(events),
+        'access_token': settings.META_ACCESS_TOKEN,
+    }
+    return meta_url(pixel_id), {'data': payload}
+
+
+def post_meta(events, pixel_id, timeout=REQUEST_TIMEOUT):
+    url, kwargs = meta_request(events, pixel_id)
+    resp = get_session('meta').post(url, timeout=timeout, **kwargs)
+    return resp.status_code, jsoncodec.loads(resp.content)
+
+
+# --- TikTok Events API -------------------------------------------------------
+
+def _build_tiktok_contents(custom_data):
+    content_ids = custom_data.get('content_ids', [])
+    content_names = custom_data.get('content_names', [])
+    content_type = custom_data.get('content_type', 'product')
+    name_count = len(content_names)
+    return [
+        {
+            'content_id': cid,
+            'content_type': content_type,
+            'content_name': content_names[i] if i < name_count else '',
+        }
+        for i, cid in enumerate(content_ids)
+    ]
+
+
+def build_tiktok_event(event_data):
+    event_name = event_data['event_name']
+    user_data = event_data.get('user_data', {})
+    custom_data = event_data.get('custom_data', {})
+
+    tt_user = {}
+    em_list = user_data.get('em')
+    if em_list:
+        tt_user['email'] = em_list[0] if isinstance(em_list, list) else em_list
+    ph_list = user_data.get('ph')
+    if ph_list:
+        tt_user['phone_number'] = ph_list[0] if isinstance(ph_list, list) else ph_list
+    ttclid = user_data.get('ttclid')
+    if ttclid:
+        tt_user['ttclid'] = ttclid
+
+    tt_context = {
+        'user_agent': user_data.get('client_user_agent', ''),
+        'ip': user_data.get('client_ip_address', ''),
+        'page': {
+            'url': event_data.get('event_source_url', ''),
+        },
+    }
+    if tt_user:
+        tt_context['user'] = tt_user
+
+    properties = {}
+    contents = _build_tiktok_contents(custom_data)
+    if contents:
+        properties['contents'] = contents
+    if custom_data.get('currency'):
+        properties['currency'] = custom_data['currency']
+    if custom_data.get('value') is not None:
+        properties['value'] = custom_data['value']
+
+    return {
+        'event': TIKTOK_EVENT_NAMES.get(event_name, event_name),
+        'event_id': event_data.get('event_id', ''),
+        'timestamp': datetime.fromtimestamp(
+            event_data.get('event_time', int(time.time())), tz=timezone.utc
+        ).strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'context': tt_context,
+        'properties': properties,
+    }
+
+
+def tiktok_request(events, pixel_code):
+    """Single events go to /pixel/track/, several to /pixel/batch/."""
+    if len(events) == 1:
+        payload = {'pixel_code': pixel_code, **events[0]}
+    else:
+        payload = {'pixel_code': pixel_code, 'batch': events}
+    return tiktok_url(batch=len(events) > 1), {
+        'data': jsoncodec.dumps(payload), 'headers': _tiktok_headers(settings.TIKTOK_ACCESS_TOKEN),
+    }
+
+
+def post_tiktok(events, pixel_code, timeout=REQUEST_TIMEOUT):
+    url, kwargs = tiktok_request(events, pixel_code)
+    resp = get_session('tiktok').post(url, timeout=timeout, **kwargs)
+    return resp.status_code, jsoncodec.loads(resp.content)
+
+
+# --- Reddit CAPI v3 ----------------------------------------------------------
+
+def _build_reddit_products(custom_data):
+    content_ids = custom_data.get('content_ids', [])
+    content_names = custom_data.get('content_names', [])
+    category = custom_data.get('content_type', 'product')
+    name_count = len(content_names)
+    return [
+        {
+            'id': cid,
+            'name': content_names[i] if i < name_count else '',
+            'category': category,
+        }
+        for i, cid in enumerate(content_ids)
+    ]
+
+
+def build_reddit_event(event_data):
+    """Build a Reddit CAPI v3 event, or None for events Reddit doesn't track."""
+    tracking_type = REDDIT_TRACKING_TYPE.get(event_data['event_name'])
+    if not tracking_type:
+        return None
+
+    user_data = event_data.get('user_data', {})
+    custom_data = event_data.get('custom_data', {})
+
+    reddit_event = {
+        'event_at': event_data.get('event_time', int(time.time())) * 1000,
+        'action_source': 'WEBSITE',
+        'type': {
+            'tracking_type': tracking_type,
+        },
+    }
+
+    event_source_url = event_data.get('event_source_url')
+    if event_source_url:
+        reddit_event['event_source_url'] = event_source_url
+
+    metadata = {}
+    event_id = event_data.get('event_id')
+    if event_id:
+        metadata['conversion_id'] = event_id
+    if custom_data.get('value') is not None:
+        metadata['value'] = round(custom_data['value'], 2)
+    if custom_data.get('currency'):
+        metadata['currency'] = custom_data['currency']
+    products = _build_reddit_products(custom_data)
+    if products:
+        metadata['products'] = products
+        metadata['item_count'] = len(products)
+    if metadata:
+        reddit_event['metadata'] = metadata
+
+    click_id = event_data.get('click_id')
+    if click_id:
+        reddit_event['click_id'] = click_id
+
+    user = {}
+    email_list = user_data.get('em')
+    if email_list:
+        user['email'] = email_list[0] if isinstance(email_list, list) else hash_identifier(email_list)
+    phone_list = user_data.get('ph')
+    if phone_list:
+        user['phone_number'] = phone_list[0] if isinstance(phone_list, list) else hash_identifier(phone_list)
+    external_id = user_data.get('external_id')
+    if external_id:
+        user['external_id'] = hash_identifier(external_id) if not external_id.startswith(('$', 'sha256:')) else external_id
+    ip = user_data.get('client_ip_address')
+    if ip:
+        user['ip_address'] = hash_identifier(ip)
+    ua = user_data.get('client_user_agent')
+    if ua:
+        user['user_agent'] = ua
+    rdt_uuid = user_data.get('rdt_uuid')
+    if rdt_uuid:
+        user['uuid'] = rdt_uuid
+    if user:
+        reddit_event['user'] = user
+    return reddit_event
+
+
+def reddit_request(events, pixel_id):
+    payload = {
+        'data': {
+            'events': events,
+        },
+    }
+    return reddit_url(pixel_id), {
+        'data': jsoncodec.dumps(payload), 'headers': _reddit_headers(settings.REDDIT_ACCESS_TOKEN),
+    }
+
+
+def post_reddit(events, pixel_id, timeout=REQUEST_TIMEOUT):
+    url, kwargs = reddit_request(events, pixel_id)
+    resp = get_session('reddit').post(url, timeout=timeout, **kwargs)
+    return resp.status_code, jsoncodec.loads(resp.content)
+
+
+BUILDERS = {
+    'meta': build_meta_event,
+    'tiktok': build_tiktok_event,
+    'reddit': build_reddit_event,
+}
+
+POSTERS = {
+    'meta': post_meta,
+    'tiktok': post_tiktok,
+    'reddit': post_reddit,
+}
+
+REQUESTS = {
+    'meta': meta_request,
+    'tiktok': tiktok_request,
+    'reddit': reddit_request,
+}
+
+
+def _async_poster(platform):
+    build_request = REQUESTS[platform]
+
+    async def post(events, pixel_id, timeout=REQUEST_TIMEOUT):
+        url, kwargs = build_request(events, pixel_id)
+        return await apost(platform, url, timeout, **kwargs)
+    return post
+
+
+# Coroutine-function counterparts of POSTERS for the ASGI ingest path (aiohttp).
+ASYNC_POSTERS = {platform: _async_poster(platform) for platform in PLATFORMS}
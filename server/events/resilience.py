@@ -0,0 +1,320 @@
+"""Retries, circuit breakers and bulkheads around platform deliveries.
+
+`call` wraps one poster call (see events.platforms.POSTERS) for a single
+platform:
+
+* bulkhead   - at most PLATFORM_MAX_CONCURRENCY calls per platform are in
+               flight in this process; extra callers wait briefly, then fail
+               fast instead of queueing behind a slow platform.
+* retries    - connection errors, 408, 429 and 5xx responses are retried
+               with exponential backoff and full jitter. Timeouts are only
+               retried within a deadline: without one, each retry could hold
+               the caller (a sync worker, in the ingest view) for another
+               full REQUEST_TIMEOUT. For the same reason, without a deadline
+               a retry is only started if it could finish, at the full
+               timeout, within PLATFORM_RETRY_BUDGET_MS of the first attempt.
+* breaker    - after PLATFORM_BREAKER_THRESHOLD consecutive failed calls the
+               platform is skipped for PLATFORM_BREAKER_RESET_SECONDS, then a
+               single trial call decides whether it closes again.
+
+`acall` is the same policy for coroutine posters (the ASGI ingest path);
+its bulkhead is an asyncio semaphore of PLATFORM_MAX_CONCURRENCY_ASYNC per
+event loop, since waiting on a socket there costs no thread.
+
+With a `deadline`, each attempt's timeout is capped at the time left and
+no retry is started that could not finish in time; if the budget is gone
+before the first attempt the call is not sent and is recorded as a 504
+(and dead-lettered like any other failure). An attempt whose timeout the
+deadline cut short and that then timed out is reported as deferred (see
+deadline.timed_out_result) and is not counted by the breaker: our budget
+ran out, the platform did nothing wrong.
+
+A poster that raises is recorded as a 504 for a timeout and a 500 for
+anything else, with a generic error: the exception itself is only logged,
+since results are echoed to the client and it can name the upstream host.
+
+Every outcome is still returned as a (status, result) pair, so callers
+record it in the log entry like any other response, and is counted with
+its duration in events.metrics. A call that failed with a retryable status
+(local skips and timeouts included) also writes its events to
+events.deadletter for `manage.py redrive_events`; a 4xx or TikTok error
+code is the platform's verdict on the events, so it is only logged.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import deadletter, metrics
+from .deadline import expired_result, timed_out_result
+from .platforms import REQUEST_TIMEOUT, is_delivered
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset((408, 429))
+
+# Raised by a sync or async poster whose attempt ran out of time.
+TIMEOUT_ERRORS = (requests.Timeout, asyncio.TimeoutError)
+
+# Separate generator so jitter doesn't disturb seeded `random` users.
+_jitter = random.Random()
+
+
+def is_retryable(status):
+    return status in RETRYABLE_STATUSES or status >= 500
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a trial slot taken by allow() without recording an outcome."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_bulkheads = {}
+_async_bulkheads = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_breaker(platform):
+    breaker = _breakers.get(platform)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(platform, CircuitBreaker(
+                settings.PLATFORM_BREAKER_THRESHOLD, settings.PLATFORM_BREAKER_RESET_SECONDS,
+            ))
+    return breaker
+
+
+def _get_bulkhead(platform):
+    bulkhead = _bulkheads.get(platform)
+    if bulkhead is None:
+        with _registry_lock:
+            bulkhead = _bulkheads.setdefault(
+                platform, threading.BoundedSemaphore(settings.PLATFORM_MAX_CONCURRENCY),
+            )
+    return bulkhead
+
+
+def _get_async_bulkhead(platform):
+    bulkheads = _async_bulkheads.setdefault(asyncio.get_running_loop(), {})
+    bulkhead = bulkheads.get(platform)
+    if bulkhead is None:
+        bulkhead = bulkheads[platform] = asyncio.BoundedSemaphore(settings.PLATFORM_MAX_CONCURRENCY_ASYNC)
+    return bulkhead
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, in seconds, before retry `attempt` (1-based)."""
+    cap = settings.PLATFORM_RETRY_MAX_DELAY_MS / 1000
+    base = settings.PLATFORM_RETRY_BASE_DELAY_MS / 1000
+    return _jitter.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def call(platform, post, events, pixel_id, deadline=None, dead_letter=True):
+    """Run `post(events, pixel_id, timeout=...)` with the platform's bulkhead, retries and breaker.
+
+    Pass dead_letter=False when the caller keeps failed events itself (redrive_events).
+    """
+    start = time.perf_counter()
+    status, result, attempts = _call(platform, post, events, pixel_id, deadline)
+    _observe(platform, start, status)
+    if dead_letter and _resendable(platform, status, result):
+        deadletter.record(platform, pixel_id, events, status, result, attempts)
+    return status, result
+
+
+async def acall(platform, post, events, pixel_id, deadline=None, dead_letter=True):
+    """Like `call`, for a coroutine `post` (see events.platforms.ASYNC_POSTERS)."""
+    start = time.perf_counter()
+    status, result, attempts = await _acall(platform, post, events, pixel_id, deadline)
+    _observe(platform, start, status)
+    if dead_letter and _resendable(platform, status, result):
+        # A SQLite write; keep it off the event loop.
+        await sync_to_async(deadletter.record, thread_sensitive=False)(
+            platform, pixel_id, events, status, result, attempts,
+        )
+    return status, result
+
+
+def _resendable(platform, status, result):
+    """A failure that sending the same events again later could fix."""
+    return is_retryable(status) and not is_delivered(platform, status, result)
+
+
+def _may_retry(deadline, started, delay):
+    """Whether a retry after `delay` seconds could still finish in time."""
+    if deadline is not None:
+        return delay < deadline.remaining()
+    elapsed = time.monotonic() - started
+    return elapsed + delay + REQUEST_TIMEOUT <= settings.PLATFORM_RETRY_BUDGET_MS / 1000
+
+
+def _observe(platform, start, status):
+    metrics.observe('events_delivery_duration_seconds', time.perf_counter() - start, platform=platform)
+    metrics.inc('events_delivery_total', platform=platform, status=str(status))
+
+
+def _raised(platform, e):
+    """(status, result, timed_out) for a poster that raised `e`."""
+    logger.warning('platform request failed', extra={'platform': platform, 'error': str(e) or type(e).__name__})
+    if isinstance(e, TIMEOUT_ERRORS):
+        return 504, {'error': f'{platform} timed out'}, True
+    return 500, {'error': f'{platform} request failed'}, False
+
+
+def _finish(breaker, status, result, attempts):
+    if is_retryable(status):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    if attempts > 1 and isinstance(result, dict):
+        result = dict(result, attempts=attempts)
+    return status, result, attempts
+
+
+def _call(platform, post, events, pixel_id, deadline):
+    if deadline is not None and deadline.expired():
+        return (*expired_result(), 0)
+
+    breaker = get_breaker(platform)
+    if not breaker.allow():
+        return 503, {'error': f'{platform} circuit open, delivery skipped'}, 0
+
+    bulkhead = _get_bulkhead(platform)
+    wait = settings.PLATFORM_BULKHEAD_WAIT_MS / 1000
+    if deadline is not None:
+        wait = deadline.timeout(wait)
+    if not bulkhead.acquire(timeout=wait):
+        breaker.release_trial()
+        return 503, {'error': f'{platform} bulkhead full, delivery skipped'}, 0
+
+    try:
+        attempts = 0
+        started = time.monotonic()
+        while True:
+            timeout = deadline.timeout(REQUEST_TIMEOUT) if deadline is not None else REQUEST_TIMEOUT
+            if timeout <= 0:
+                if not attempts:
+                    breaker.release_trial()
+                    return (*expired_result(), 0)
+                break
+            attempts += 1
+            timed_out = False
+            try:
+                status, result = post(events, pixel_id, timeout=timeout)
+            except Exception as e:
+                status, result, timed_out = _raised(platform, e)
+            if timed_out and timeout < REQUEST_TIMEOUT:
+                breaker.release_trial()
+                return (*timed_out_result(), attempts)
+            if not is_retryable(status) or attempts >= settings.PLATFORM_RETRY_ATTEMPTS:
+                break
+            if timed_out and deadline is None:
+                break
+            delay = backoff_delay(attempts)
+            if not _may_retry(deadline, started, delay):
+                break
+            time.sleep(delay)
+    finally:
+        bulkhead.release()
+    return _finish(breaker, status, result, attempts)
+
+
+async def _acall(platform, post, events, pixel_id, deadline):
+    if deadline is not None and deadline.expired():
+        return (*expired_result(), 0)
+
+    breaker = get_breaker(platform)
+    if not breaker.allow():
+        return 503, {'error': f'{platform} circuit open, delivery skipped'}, 0
+
+    bulkhead = _get_async_bulkhead(platform)
+    if bulkhead.locked():
+        wait = settings.PLATFORM_BULKHEAD_WAIT_MS / 1000
+        if deadline is not None:
+            wait = deadline.timeout(wait)
+        try:
+            await asyncio.wait_for(bulkhead.acquire(), max(wait, 0.001))
+        except asyncio.TimeoutError:
+            breaker.release_trial()
+            return 503, {'error': f'{platform} bulkhead full, delivery skipped'}, 0
+    else:
+        await bulkhead.acquire()
+
+    try:
+        attempts = 0
+        started = time.monotonic()
+        while True:
+            timeout = deadline.timeout(REQUEST_TIMEOUT) if deadline is not None else REQUEST_TIMEOUT
+            if timeout <= 0:
+                if not attempts:
+                    breaker.release_trial()
+                    return (*expired_result(), 0)
+                break
+            attempts += 1
+            timed_out = False
+            try:
+                status, result = await post(events, pixel_id, timeout=timeout)
+            except Exception as e:
+                status, result, timed_out = _raised(platform, e)
+            if timed_out and timeout < REQUEST_TIMEOUT:
+                breaker.release_trial()
+                return (*timed_out_result(), attempts)
+            if not is_retryable(status) or attempts >= settings.PLATFORM_RETRY_ATTEMPTS:
+                break
+            if timed_out and deadline is None:
+                break
+            delay = backoff_delay(attempts)
+            if not _may_retry(deadline, started, delay):
+                break
+            await asyncio.sleep(delay)
+    finally:
+        bulkhead.release()
+    return _finish(breaker, status, result, attempts)
@@ -0,0 +1,202 @@
+"""Durable local queue for events accepted in async delivery mode.
+
+Events are written to a SQLite database (WAL mode) before `/api/event`
+returns, and a background dispatcher thread in each worker process drains
+it. Rows are claimed with a lease, so anything held by a worker that died
+mid-delivery is picked up again once the lease runs out. Each row is acked
+as soon as it is delivered and the lease on the rest of its batch renewed,
+so a live dispatcher never loses rows to another worker and resends them.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+from . import db, jsoncodec
+from .platforms import PLATFORMS, REQUEST_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Shortest lease; see lease_seconds().
+LEASE_SECONDS = 60
+CLAIM_BATCH_SIZE = 50
+IDLE_WAIT = 0.5
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS spool_claimed_at ON spool (claimed_at);
+'''
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _connect():
+    return db.connect(settings.EVENT_SPOOL_PATH, _SCHEMA)
+
+
+def enqueue(record):
+    """Persist a JSON-serializable record and wake the dispatcher."""
+    cur = _connect().execute(
+        'INSERT INTO spool (enqueued_at, record) VALUES (?, ?)',
+        (time.time(), jsoncodec.dumps_str(record)),
+    )
+    _wakeup.set()
+    return cur.lastrowid
+
+
+def enqueue_many(records):
+    """`enqueue` for several records, in one transaction."""
+    now = time.time()
+    conn = _connect()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            'INSERT INTO spool (enqueued_at, record) VALUES (?, ?)',
+            [(now, jsoncodec.dumps_str(record)) for record in records],
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    _wakeup.set()
+
+
+def lease_seconds():
+    """How long a claim holds: twice the longest one record's delivery can take.
+
+    That is every platform in turn using all its retries at the full
+    request timeout, with the longest backoff between them.
+    """
+    attempts = settings.PLATFORM_RETRY_ATTEMPTS
+    per_platform = attempts * REQUEST_TIMEOUT + (attempts - 1) * settings.PLATFORM_RETRY_MAX_DELAY_MS / 1000
+    return max(LEASE_SECONDS, 2 * len(PLATFORMS) * per_platform)
+
+
+def depth():
+    return _connect().execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+
+def claim(limit=CLAIM_BATCH_SIZE):
+    """Lease up to `limit` pending rows; returns [(id, attempts, record)]."""
+    now = time.time()
+    conn = _connect()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        rows = conn.execute(
+            'SELECT id, attempts, record FROM spool '
+            'WHERE claimed_at IS NULL OR claimed_at < ? ORDER BY id LIMIT ?',
+            (now - lease_seconds(), limit),
+        ).fetchall()
+        conn.executemany(
+            'UPDATE spool SET claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+            [(now, row_id) for row_id, _, _ in rows],
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return [(row_id, attempts + 1, jsoncodec.loads(record)) for row_id, attempts, record in rows]
+
+
+def ack(row_id):
+    _connect().execute('DELETE FROM spool WHERE id = ?', (row_id,))
+
+
+def release(row_id):
+    _connect().execute('UPDATE spool SET claimed_at = NULL WHERE id = ?', (row_id,))
+
+
+def renew(row_ids):
+    """Restart the lease on rows this process still holds."""
+    now = time.time()
+    _connect().executemany('UPDATE spool SET claimed_at = ? WHERE id = ?', [(now, row_id) for row_id in row_ids])
+
+
+def drain(handler, limit=CLAIM_BATCH_SIZE):
+    """Claim one batch and pass its records to `handler(records, delivered)`.
+
+    The handler calls `delivered(i)` once records[i] is delivered: that row
+    is acked at once and the lease on the rows still waiting is renewed.
+    Rows the handler returns without marking are acked then. If it raises,
+    the rows not yet acked are released for another attempt until
+    EVENT_SPOOL_MAX_ATTEMPTS is reached. Returns the number of rows claimed.
+    """
+    rows = claim(limit)
+    if not rows:
+        return 0
+    waiting = {row_id: attempts for row_id, attempts, _ in rows}
+
+    def delivered(index):
+        row_id = rows[index][0]
+        ack(row_id)
+        del waiting[row_id]
+        if waiting:
+            renew(waiting)
+
+    try:
+        handler([record for _, _, record in rows], delivered)
+    except Exception as e:
+        logger.warning('spool delivery failed', extra={'rows': len(waiting), 'error': str(e)})
+        for row_id, attempts in waiting.items():
+            if attempts < settings.EVENT_SPOOL_MAX_ATTEMPTS:
+                release(row_id)
+            else:
+                logger.error('dropping spooled event', extra={'row_id': row_id, 'attempts': attempts})
+                ack(row_id)
+        return len(rows)
+    for row_id in waiting:
+        ack(row_id)
+    return len(rows)
+
+
+def _run(handler):
+    while not _stop.is_set():
+        try:
+            handled = drain(handler)
+        except sqlite3.Error as e:
+            logger.error('spool error', extra={'error': str(e)})
+            handled = 0
+        if not handled:
+            _wakeup.wait(IDLE_WAIT)
+            _wakeup.clear()
+
+
+def start_dispatcher(handler):
+    """Start this process's background dispatcher once; safe to call per request.
+
+    Also restarts it in a forked worker, where the thread started by the
+    parent (e.g. from EventsConfig.ready under gunicorn --preload) is gone.
+    """
+    global _dispatcher
+    if _dispatcher is not None and _dispatcher.is_alive():
+        return
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(
+                target=_run, args=(handler,), name='event-spool', daemon=True,
+            )
+            _dispatcher.start()
+
+
+def stop_dispatcher():
+    """Stop this process's dispatcher after its current batch; rows left stay spooled."""
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is None:
+        return
+    _stop.set()
+    _wakeup.set()
+    dispatcher.join()
+    _stop.clear()
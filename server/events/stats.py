@@ -0,0 +1,19 @@
+"""Small helpers for summarizing latency samples."""
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(samples, pcts=(50, 95, 99)):
+    """Format seconds as 'n=.. p50=..ms p95=..ms p99=..ms max=..ms'."""
+    values = sorted(samples)
+    parts = [f'n={len(values)}']
+    parts += [f'p{p}={percentile(values, p) * 1000:.1f}ms' for p in pcts]
+    if values:
+        parts.append(f'max={values[-1] * 1000:.1f}ms')
+    return ' '.join(parts)
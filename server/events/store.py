@@ -0,0 +1,124 @@
+"""Optional on-disk event log shared by every worker process.
+
+When EVENT_STORE_PATH is set, `_append_log` also writes each entry to this
+SQLite table, and `/api/event-log` reads from it. The table is indexed by
+event_id, event_name, log time and per-platform status, so filtered queries
+and keyset pagination (`cursor` = last row id seen) stay cheap as it grows.
+"""
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+from . import db, jsoncodec
+from .platforms import PLATFORMS
+
+MAX_PAGE_SIZE = 1000
+PRUNE_EVERY = 1000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS event_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    logged_at REAL NOT NULL,
+    event_name TEXT,
+    event_id TEXT,
+    source TEXT,
+    meta_status INTEGER,
+    tiktok_status INTEGER,
+    reddit_status INTEGER,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_log_event_id ON event_log (event_id);
+CREATE INDEX IF NOT EXISTS event_log_event_name ON event_log (event_name, id);
+CREATE INDEX IF NOT EXISTS event_log_logged_at ON event_log (logged_at);
+CREATE INDEX IF NOT EXISTS event_log_meta_status ON event_log (meta_status, id);
+CREATE INDEX IF NOT EXISTS event_log_tiktok_status ON event_log (tiktok_status, id);
+CREATE INDEX IF NOT EXISTS event_log_reddit_status ON event_log (reddit_status, id);
+'''
+
+# Query parameters accepted by `query`, mapped to their column.
+EQUALITY_FILTERS = {
+    'event_id': 'event_id',
+    'event_name': 'event_name',
+    'source': 'source',
+    **{f'{platform}_status': f'{platform}_status' for platform in PLATFORMS},
+}
+FILTER_PARAMS = frozenset(EQUALITY_FILTERS) | {'since', 'until', 'cursor'}
+
+_inserts = 0
+
+
+def enabled():
+    return bool(settings.EVENT_STORE_PATH)
+
+
+def _connect():
+    return db.connect(settings.EVENT_STORE_PATH, _SCHEMA)
+
+
+def append(entry, data=None):
+    """Insert a log entry; `data` is its JSON text if the caller already encoded it."""
+    global _inserts
+    if data is None:
+        data = jsoncodec.dumps_str(entry)
+    now = time.time()
+    conn = _connect()
+    conn.execute(
+        'INSERT INTO event_log (logged_at, event_name, event_id, source, '
+        'meta_status, tiktok_status, reddit_status, entry) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            now,
+            entry.get('event_name'),
+            entry.get('event_id'),
+            entry.get('source', 'api'),
+            entry.get('meta_status_code'),
+            entry.get('tiktok_status_code'),
+            entry.get('reddit_status_code'),
+            data,
+        ),
+    )
+    _inserts += 1
+    if settings.EVENT_STORE_RETENTION_DAYS and _inserts % PRUNE_EVERY == 0:
+        cutoff = now - settings.EVENT_STORE_RETENTION_DAYS * 86400
+        conn.execute('DELETE FROM event_log WHERE logged_at < ?', (cutoff,))
+
+
+def parse_time(value):
+    """Unix seconds or an ISO 8601 timestamp -> unix seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def query(params, limit=100):
+    """Newest-first page of entries matching `params`.
+
+    Returns (list of JSON texts, next cursor or None). Raises ValueError
+    for malformed parameter values.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    clauses = []
+    args = []
+    for name, column in EQUALITY_FILTERS.items():
+        if name in params:
+            value = params[name]
+            clauses.append(f'{column} = ?')
+            args.append(int(value) if column.endswith('_status') else value)
+    if 'since' in params:
+        clauses.append('logged_at >= ?')
+        args.append(parse_time(params['since']))
+    if 'until' in params:
+        clauses.append('logged_at < ?')
+        args.append(parse_time(params['until']))
+    if 'cursor' in params:
+        clauses.append('id < ?')
+        args.append(int(params['cursor']))
+
+    where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+    rows = _connect().execute(
+        f'SELECT id, entry FROM event_log {where}ORDER BY id DESC LIMIT ?',
+        (*args, limit + 1),
+    ).fetchall()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return [entry for _, entry in rows[:limit]], next_cursor
@@ -0,0 +1,158 @@
+"""Per-request phase timings.
+
+`trace(name)` starts collecting spans for the current request (or command
+iteration); `span(name)` times one phase of it and does nothing when no
+trace is active, so the helpers it wraps cost nothing extra elsewhere. The
+active trace lives in a context variable, which asyncio tasks inherit;
+work handed to a thread pool must be wrapped with `bind` to keep
+recording into it.
+
+`send_event` turns its trace into a `Server-Timing` response header and,
+for an EVENT_TRACE_SAMPLE_RATE fraction of requests, appends it as one JSON
+line to EVENT_TRACE_PATH.
+"""
+import asyncio
+import contextvars
+import functools
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import jsoncodec
+
+_current = contextvars.ContextVar('events_trace', default=None)
+_sampler = random.Random()
+_write_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, duration):
+        with self._lock:
+            self.spans.append((name, start - self._start, duration))
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def durations(self):
+        """Seconds per span name, summed when a phase ran more than once."""
+        totals = {}
+        with self._lock:
+            for name, _, duration in self.spans:
+                totals[name] = totals.get(name, 0) + duration
+        return totals
+
+    def server_timing(self):
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.durations().items()]
+        if self.duration is not None:
+            parts.append(f'total;dur={self.duration * 1000:.2f}')
+        return ', '.join(parts)
+
+    def to_json(self, **fields):
+        with self._lock:
+            spans = [
+                {'name': name, 'start_ms': round(offset * 1000, 3), 'duration_ms': round(duration * 1000, 3)}
+                for name, offset, duration in self.spans
+            ]
+        return jsoncodec.dumps_str({
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'ts': round(self.started_at, 3),
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            **fields,
+            'spans': spans,
+        })
+
+
+@contextmanager
+def trace(name):
+    """Collect spans into a new Trace for the duration of the block."""
+    current = Trace(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        current.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(name, start, time.perf_counter() - start)
+
+
+def bind(fn):
+    """`fn` wrapped to run in a copy of the caller's context (and so its trace)."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+def _sampled_line(current, **fields):
+    """`current` as a trace line if this trace is sampled, else None."""
+    if not settings.EVENT_TRACE_PATH or _sampler.random() >= settings.EVENT_TRACE_SAMPLE_RATE:
+        return None
+    return current.to_json(**fields) + '\n'
+
+
+def _write(line):
+    with _write_lock:
+        with open(settings.EVENT_TRACE_PATH, 'a') as f:
+            f.write(line)
+
+
+def maybe_write(current, **fields):
+    """Append `current` to EVENT_TRACE_PATH if this trace is sampled."""
+    line = _sampled_line(current, **fields)
+    if line is not None:
+        _write(line)
+
+
+def traced(view):
+    """Trace `view`: add a Server-Timing header and write a sampled trace line."""
+    def finish(request, current, response):
+        if settings.EVENT_SERVER_TIMING:
+            response['Server-Timing'] = current.server_timing()
+        return _sampled_line(current, path=request.path, status=response.status_code)
+
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with trace(view.__name__) as current:
+                response = await view(request, *args, **kwargs)
+            line = finish(request, current, response)
+            if line is not None:
+                # File I/O; keep it off the event loop.
+                await sync_to_async(_write, thread_sensitive=False)(line)
+            return response
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with trace(view.__name__) as current:
+            response = view(request, *args, **kwargs)
+        line = finish(request, current, response)
+        if line is not None:
+            _write(line)
+        return response
+    return wrapper
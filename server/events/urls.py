@@ -1,7 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('event', views.send_event, name='send_event'),
+    path(
+        'event',
+        views.send_event_async if settings.EVENT_INGEST_ASYNC else views.send_event,
+        name='send_event',
+    ),
+    path(
+        'events',
+        views.send_events_async if settings.EVENT_INGEST_ASYNC else views.send_events,
+        name='send_events',
+    ),
     path('event-log', views.get_event_log, name='event_log'),
+    path('metrics', views.get_metrics, name='metrics'),
 ]
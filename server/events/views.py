@@ -1,48 +1,43 @@
-import copy
-import hashlib
-import json
+import asyncio
+import logging
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timezone
-import requests as http_requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 
-
-META_GRAPH_API_URL = 'https://graph.facebook.com/v24.0/{pixel_id}/events'
-TIKTOK_EVENTS_API_URL = 'https://business-api.tiktok.com/open_api/v1.3/pixel/track/'
-REDDIT_CAPI_URL = 'https://ads-api.reddit.com/api/v3/pixels/{pixel_id}/conversion_events'
-
-EVENT_MAP = {
-    'ViewContent': {'meta': 'ViewContent', 'tiktok': 'ViewContent', 'reddit': 'ViewContent'},
-    'AddToCart':   {'meta': 'AddToCart',   'tiktok': 'AddToCart',   'reddit': 'AddToCart'},
-    'Purchase':    {'meta': 'Purchase',    'tiktok': 'CompletePayment', 'reddit': 'Purchase'},
-    'Lead':        {'meta': 'Lead',        'tiktok': 'SubmitForm',     'reddit': 'Lead'},
-}
-
-REDDIT_TRACKING_TYPE = {
-    'ViewContent': 'VIEW_CONTENT',
-    'AddToCart':   'ADD_TO_CART',
-    'Purchase':    'PURCHASE',
-    'Lead':        'LEAD',
-    'PageVisit':   'PAGE_VISIT',
-    'Search':      'SEARCH',
-    'SignUp':      'SIGN_UP',
-    'AddToWishlist': 'ADD_TO_WISHLIST',
-}
-
-
-def platform_event_name(event_name, platform):
-    entry = EVENT_MAP.get(event_name, {})
-    return entry.get(platform, event_name)
-
-MAX_LOG_ENTRIES = 100
-event_log = []
-
-
-def _sha256(value):
-    return hashlib.sha256(value.lower().strip().encode()).hexdigest()
+from . import clients, deadletter, dedup, jsoncodec, metrics, resilience, spool, store, tracing
+from .batching import MicroBatcher
+from .deadline import Deadline, is_deferred, timed_out_result
+from .eventlog import EventLog
+from .jsoncodec import json_response
+from .log import AsyncStreamHandler, log_delivery
+from .platforms import (
+    ASYNC_POSTERS,
+    BUILDERS,
+    PLATFORMS,
+    POSTERS,
+    build_meta_event,
+    build_reddit_event,
+    build_tiktok_event,
+    events_received,
+    is_delivered,
+    is_enabled,
+    pixel_id,
+    post_meta,
+    post_reddit,
+    post_tiktok,
+)
+
+
+logger = logging.getLogger(__name__)
+
+event_log = EventLog(settings.EVENT_LOG_CAPACITY)
 
 
 def get_client_ip(request):
@@ -52,227 +47,307 @@ def get_client_ip(request):
     return request.META.get('REMOTE_ADDR', '')
 
 
-def _send_to_meta(event_data):
-    sanitized = copy.deepcopy(event_data)
-    sanitized.pop('click_id', None)
-    ud = sanitized.get('user_data', {})
-    for key in ('em', 'ph', 'email', 'phone'):
-        ud.pop(key, None)
-    fbc = ud.pop('fbc', None)
-    ud.pop('ttclid', None)
-    if fbc:
-        ud['fbc'] = fbc
-
-    payload = {
-        'data': json.dumps([sanitized]),
-        'access_token': settings.META_ACCESS_TOKEN,
-    }
-    url = META_GRAPH_API_URL.format(pixel_id=settings.META_PIXEL_ID)
-    try:
-        resp = http_requests.post(url, data=payload, timeout=10)
-        result = resp.json()
-        print(f'[Meta CAPI] {event_data["event_name"]} -> {resp.status_code}: {result}')
-        return resp.status_code, result
-    except Exception as e:
-        print(f'[Meta CAPI] Error: {e}')
-        return 500, {'error': str(e)}
+def _send_failed(platform, name, e):
+    """Log an unexpected delivery error; the result, which reaches the client, stays generic."""
+    logger.warning('delivery failed', extra={'platform': platform, 'error': str(e) or type(e).__name__})
+    result = {'error': f'{platform} delivery failed'}
+    log_delivery(platform, name, 500, result)
+    return 500, result
 
 
-def _build_tiktok_contents(custom_data):
-    content_ids = custom_data.get('content_ids', [])
-    content_names = custom_data.get('content_names', [])
-    content_type = custom_data.get('content_type', 'product')
-    return [
-        {
-            'content_id': cid,
-            'content_type': content_type,
-            'content_name': content_names[i] if i < len(content_names) else '',
-        }
-        for i, cid in enumerate(content_ids)
-    ]
+def _send_to_meta(event_data, deadline=None):
+    try:
+        with tracing.span('meta_build'):
+            meta_event = build_meta_event(event_data)
+        with tracing.span('meta_post'):
+            status, result = resilience.call(
+                'meta', post_meta, [meta_event], settings.META_PIXEL_ID, deadline,
+            )
+        log_delivery('meta', event_data['event_name'], status, result)
+        return status, result
+    except Exception as e:
+        return _send_failed('meta', event_data['event_name'], e)
 
 
-def _send_to_tiktok(event_data):
+def _send_to_tiktok(event_data, deadline=None):
     if not settings.TIKTOK_ACCESS_TOKEN:
         return None, None
 
-    event_name = event_data['event_name']
-    tt_event = platform_event_name(event_name, 'tiktok')
-    user_data = event_data.get('user_data', {})
-    custom_data = event_data.get('custom_data', {})
-
-    tt_user = {}
-    em_list = user_data.get('em', [])
-    if em_list:
-        tt_user['email'] = em_list[0] if isinstance(em_list, list) else em_list
-    ph_list = user_data.get('ph', [])
-    if ph_list:
-        tt_user['phone_number'] = ph_list[0] if isinstance(ph_list, list) else ph_list
-    ttclid = user_data.get('ttclid')
-    if ttclid:
-        tt_user['ttclid'] = ttclid
-
-    tt_context = {
-        'user_agent': user_data.get('client_user_agent', ''),
-        'ip': user_data.get('client_ip_address', ''),
-        'page': {
-            'url': event_data.get('event_source_url', ''),
-        },
-    }
-    if tt_user:
-        tt_context['user'] = tt_user
-
-    tt_payload = {
-        'pixel_code': settings.TIKTOK_PIXEL_ID,
-        'event': tt_event,
-        'event_id': event_data.get('event_id', ''),
-        'timestamp': datetime.fromtimestamp(
-            event_data.get('event_time', int(time.time())), tz=timezone.utc
-        ).strftime('%Y-%m-%dT%H:%M:%S%z'),
-        'context': tt_context,
-        'properties': {},
-    }
+    try:
+        with tracing.span('tiktok_build'):
+            tt_event = build_tiktok_event(event_data)
+        with tracing.span('tiktok_post'):
+            status, result = resilience.call(
+                'tiktok', post_tiktok, [tt_event], settings.TIKTOK_PIXEL_ID, deadline,
+            )
+        log_delivery('tiktok', tt_event['event'], status, result)
+        return status, result
+    except Exception as e:
+        return _send_failed('tiktok', event_data['event_name'], e)
 
-    contents = _build_tiktok_contents(custom_data)
-    if contents:
-        tt_payload['properties']['contents'] = contents
-    if custom_data.get('currency'):
-        tt_payload['properties']['currency'] = custom_data['currency']
-    if custom_data.get('value') is not None:
-        tt_payload['properties']['value'] = custom_data['value']
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Token': settings.TIKTOK_ACCESS_TOKEN,
-    }
+
+def _send_to_reddit(event_data, deadline=None):
+    """Send conversion event to Reddit CAPI v3."""
+    if not settings.REDDIT_ACCESS_TOKEN:
+        return None, None
+
+    with tracing.span('reddit_build'):
+        reddit_event = build_reddit_event(event_data)
+    if reddit_event is None:
+        return None, None
 
     try:
-        resp = http_requests.post(TIKTOK_EVENTS_API_URL, json=tt_payload, headers=headers, timeout=10)
-        result = resp.json()
-        print(f'[TikTok EAPI] {tt_event} -> {resp.status_code}: {result}')
-        return resp.status_code, result
+        with tracing.span('reddit_post'):
+            status, result = resilience.call(
+                'reddit', post_reddit, [reddit_event], settings.REDDIT_PIXEL_ID, deadline,
+            )
+        log_delivery('reddit', reddit_event['type']['tracking_type'], status, result)
+        return status, result
     except Exception as e:
-        print(f'[TikTok EAPI] Error: {e}')
-        return 500, {'error': str(e)}
+        return _send_failed('reddit', reddit_event['type']['tracking_type'], e)
+
+
+PLATFORM_SENDERS = (
+    ('meta', _send_to_meta),
+    ('tiktok', _send_to_tiktok),
+    ('reddit', _send_to_reddit),
+)
+
+_executors = {}
+_executor_lock = threading.Lock()
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _get_executor(platform):
+    """Each platform has its own bounded pool, so one slow API can't starve the others."""
+    executor = _executors.get(platform)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(platform)
+            if executor is None:
+                executor = _executors[platform] = ThreadPoolExecutor(
+                    max_workers=settings.EVENT_DISPATCH_WORKERS,
+                    thread_name_prefix=f'capi-{platform}',
+                )
+    return executor
+
+
+def _get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    _send_batch,
+                    max_size=settings.EVENT_BATCH_MAX_SIZE,
+                    max_wait=settings.EVENT_BATCH_MAX_WAIT_MS / 1000,
+                    executor_for=_get_executor,
+                )
+    return _batcher
+
+
+# Recorded for every event of a batch the platform only partly accepted.
+PARTIAL_BATCH_STATUS = 502
+
+
+def _send_batch(platform, pixel_id, events):
+    """Post one batch and give every event the batch's status and response.
+
+    Only Meta says how many events it took. If that is fewer than were sent
+    there is no telling which, so each event is recorded as failed and the
+    batch dead-lettered (Meta deduplicates the resend by event_id). Other
+    platforms' results are marked confirmed=False: the batch went through,
+    but nothing vouches for each event in it.
+    """
+    status, result = resilience.call(platform, POSTERS[platform], events, pixel_id)
+    if not isinstance(result, dict):
+        result = {'response': result}
+    if is_delivered(platform, status, result):
+        received = events_received(platform, result)
+        if received is not None and received < len(events):
+            status, result = PARTIAL_BATCH_STATUS, {
+                'error': f'{platform} accepted {received} of {len(events)} events in the batch',
+            }
+            deadletter.record(platform, pixel_id, events, status, result, 1)
+        else:
+            result = dict(result, confirmed=received is not None)
+    log_delivery(platform, None, status, result, batch_size=len(events))
+    return [
+        (status, dict(result, batch_size=len(events), batch_index=i))
+        for i in range(len(events))
+    ]
+
+
+def _batch_units(event_data):
+    """Per-platform (pixel_id, event) pairs to hand to the batcher."""
+    units = {}
+    for platform in PLATFORMS:
+        if is_enabled(platform):
+            unit = BUILDERS[platform](event_data)
+            if unit is not None:
+                units[platform] = (pixel_id(platform), unit)
+    return units
 
 
-def _build_reddit_products(custom_data):
-    content_ids = custom_data.get('content_ids', [])
-    content_names = custom_data.get('content_names', [])
+def _wait(future, deadline):
+    """A future's (status, result), or the deferred result once the deadline passes."""
+    if deadline is None:
+        return future.result()
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeoutError:
+        return timed_out_result()
+
+
+def deliver_events(events, batched=None, deadline=None):
+    """Deliver several events; returns one {platform: (status, result)} per event.
+
+    When batching (EVENT_BATCHING, or `batched=True`), events are grouped per
+    platform and pixel by the shared MicroBatcher, so a list of N events costs
+    one POST per platform instead of N. Batches still waiting when `deadline`
+    passes are reported as deferred and are sent once they flush.
+    """
+    if batched is None:
+        batched = settings.EVENT_BATCHING
+    if not batched:
+        return [deliver_event(event_data, deadline) for event_data in events]
+
+    batcher = _get_batcher()
+    pending = []
+    for event_data in events:
+        pending.append({
+            platform: batcher.submit(platform, pixel, unit)
+            for platform, (pixel, unit) in _batch_units(event_data).items()
+        })
+    if len(events) > 1:
+        # The caller already formed a batch; don't hold it for the timer.
+        batcher.flush()
     return [
         {
-            'id': cid,
-            'name': content_names[i] if i < len(content_names) else '',
-            'category': custom_data.get('content_type', 'product'),
+            platform: _wait(futures[platform], deadline) if platform in futures else (None, None)
+            for platform in PLATFORMS
         }
-        for i, cid in enumerate(content_ids)
+        for futures in pending
     ]
 
 
-def _send_to_reddit(event_data):
-    """Send conversion event to Reddit CAPI v3."""
-    if not settings.REDDIT_ACCESS_TOKEN:
-        return None, None
+def deliver_event(event_data, deadline=None):
+    """Send an event to every platform and return {platform: (status, result)}.
+
+    In 'concurrent' mode each platform call runs on that platform's bounded
+    thread pool, so the request waits for the slowest platform instead of
+    the sum. With a `deadline`, sequential delivery gives Meta, whose answer
+    is the response, half the budget and each later platform an even share
+    of the time left, skipping (504) one whose share is gone; concurrent delivery gives each the whole budget, and anything
+    unfinished keeps running and is recorded as deferred.
+    """
+    if settings.EVENT_BATCHING:
+        return deliver_events([event_data], deadline=deadline)[0]
+
+    if settings.EVENT_DISPATCH_MODE != 'concurrent':
+        results = {}
+        for i, (name, send) in enumerate(PLATFORM_SENDERS):
+            share = None
+            if deadline is not None:
+                share = deadline.split(2 if i == 0 else len(PLATFORM_SENDERS) - i)
+            results[name] = send(event_data, share)
+        return results
+
+    futures = [
+        (name, _get_executor(name).submit(tracing.bind(send), event_data, deadline))
+        for name, send in PLATFORM_SENDERS
+    ]
+    return {name: _wait(future, deadline) for name, future in futures}
 
-    event_name = event_data['event_name']
-    tracking_type = REDDIT_TRACKING_TYPE.get(event_name)
-    if not tracking_type:
-        return None, None
 
-    user_data = event_data.get('user_data', {})
-    custom_data = event_data.get('custom_data', {})
+# Platform calls still running after an async request's deadline; kept
+# referenced until they finish so they are not garbage collected mid-send.
+_background = set()
 
-    event_time = event_data.get('event_time', int(time.time()))
-    event_at_ms = event_time * 1000
 
-    reddit_event = {
-        'event_at': event_at_ms,
-        'action_source': 'WEBSITE',
-        'type': {
-            'tracking_type': tracking_type,
-        },
-    }
+def _delivered_name(platform, unit):
+    if platform == 'tiktok':
+        return unit['event']
+    if platform == 'reddit':
+        return unit['type']['tracking_type']
+    return unit['event_name']
 
-    event_source_url = event_data.get('event_source_url')
-    if event_source_url:
-        reddit_event['event_source_url'] = event_source_url
-
-    metadata = {}
-    event_id = event_data.get('event_id')
-    if event_id:
-        metadata['conversion_id'] = event_id
-    if custom_data.get('value') is not None:
-        metadata['value'] = round(custom_data['value'], 2)
-    if custom_data.get('currency'):
-        metadata['currency'] = custom_data['currency']
-    products = _build_reddit_products(custom_data)
-    if products:
-        metadata['products'] = products
-        metadata['item_count'] = len(products)
-    if metadata:
-        reddit_event['metadata'] = metadata
-
-    click_id = event_data.get('click_id')
-    if click_id:
-        reddit_event['click_id'] = click_id
-
-    user = {}
-    email_list = user_data.get('em', [])
-    if email_list:
-        user['email'] = email_list[0] if isinstance(email_list, list) else _sha256(email_list)
-    phone_list = user_data.get('ph', [])
-    if phone_list:
-        user['phone_number'] = phone_list[0] if isinstance(phone_list, list) else _sha256(phone_list)
-    external_id = user_data.get('external_id')
-    if external_id:
-        user['external_id'] = _sha256(external_id) if not external_id.startswith(('$', 'sha256:')) else external_id
-    ip = user_data.get('client_ip_address')
-    if ip:
-        user['ip_address'] = _sha256(ip)
-    ua = user_data.get('client_user_agent')
-    if ua:
-        user['user_agent'] = ua
-    rdt_uuid = user_data.get('rdt_uuid')
-    if rdt_uuid:
-        user['uuid'] = rdt_uuid
-    if user:
-        reddit_event['user'] = user
-
-    url = REDDIT_CAPI_URL.format(pixel_id=settings.REDDIT_PIXEL_ID)
-    payload = {
-        'data': {
-            'events': [reddit_event],
-        },
-    }
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {settings.REDDIT_ACCESS_TOKEN}',
-    }
 
+async def _asend(platform, event_data, deadline):
+    if not is_enabled(platform):
+        return None, None
+    with tracing.span(f'{platform}_build'):
+        unit = BUILDERS[platform](event_data)
+    if unit is None:
+        return None, None
     try:
-        resp = http_requests.post(url, json=payload, headers=headers, timeout=10)
-        result = resp.json()
-        print(f'[Reddit CAPI v3] {tracking_type} -> {resp.status_code}: {result}')
-        return resp.status_code, result
+        with tracing.span(f'{platform}_post'):
+            status, result = await resilience.acall(
+                platform, ASYNC_POSTERS[platform], [unit], pixel_id(platform), deadline,
+            )
     except Exception as e:
-        print(f'[Reddit CAPI v3] Error: {e}')
-        return 500, {'error': str(e)}
+        return _send_failed(platform, _delivered_name(platform, unit), e)
+    log_delivery(platform, _delivered_name(platform, unit), status, result)
+    return status, result
 
 
-@csrf_exempt
-@require_POST
-def send_event(request):
-    try:
-        body = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+async def adeliver_event(event_data, deadline=None):
+    """Coroutine `deliver_event`: every platform at once on this event loop.
+
+    Uses the aiohttp clients, so thousands of calls can be in flight without
+    a thread each. Platforms unfinished at the deadline are recorded as
+    deferred and keep running. Without aiohttp, or with EVENT_BATCHING (the
+    batcher is thread-based), `deliver_event` runs in a worker thread.
+    """
+    if clients.aiohttp is None or settings.EVENT_BATCHING:
+        return await sync_to_async(deliver_event, thread_sensitive=False)(event_data, deadline)
 
+    tasks = {
+        platform: asyncio.ensure_future(_asend(platform, event_data, deadline))
+        for platform in PLATFORMS
+    }
+    await asyncio.wait(tasks.values(), timeout=deadline.remaining() if deadline is not None else None)
+    results = {}
+    for platform, task in tasks.items():
+        if task.done():
+            results[platform] = task.result()
+        else:
+            results[platform] = timed_out_result()
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+    return results
+
+
+def _record_results(log_entry, results):
+    for name, (status, result) in results.items():
+        if status is not None:
+            log_entry[f'{name}_status_code'] = status
+            log_entry[f'{name}_response'] = result
+
+
+def _deliver_spooled(records, delivered):
+    """Spool handler: deliver `records`, reporting each to `delivered` as soon as it is done."""
+    if settings.EVENT_BATCHING:
+        all_results = deliver_events([record['event'] for record in records])
+    else:
+        # Lazily, so each record is acked before the next one is sent.
+        all_results = (deliver_event(record['event']) for record in records)
+    for i, (record, results) in enumerate(zip(records, all_results)):
+        log_entry = dict(record['log'], payload_sent=record['event'])
+        _record_results(log_entry, results)
+        _append_log(log_entry)
+        delivered(i)
+
+
+def _build_event(body, client_ip):
+    """The canonical event_data for one request body, or None without an event_name."""
     event_name = body.get('event_name')
     if not event_name:
-        return JsonResponse({'error': 'event_name is required'}, status=400)
+        return None
 
     user_data = body.get('user_data', {})
-    user_data['client_ip_address'] = get_client_ip(request)
+    user_data['client_ip_address'] = client_ip
 
     event_data = {
         'event_name': event_name,
@@ -293,37 +368,329 @@ def send_event(request):
     if body.get('custom_data'):
         event_data['custom_data'] = body['custom_data']
 
-    log_entry = {
+    return event_data
+
+
+def _new_log_entry(event_data, **fields):
+    return {
         'timestamp': datetime.now(timezone.utc).isoformat(),
-        'event_name': event_name,
+        'event_name': event_data['event_name'],
         'event_id': event_data.get('event_id'),
-        'payload_sent': event_data,
+        **fields,
     }
 
-    meta_status, meta_result = _send_to_meta(event_data)
-    log_entry['meta_status_code'] = meta_status
-    log_entry['meta_response'] = meta_result
 
-    tt_status, tt_result = _send_to_tiktok(event_data)
-    if tt_status is not None:
-        log_entry['tiktok_status_code'] = tt_status
-        log_entry['tiktok_response'] = tt_result
+def _is_duplicate(event_data, log_entry):
+    with tracing.span('dedup'):
+        duplicate = dedup.is_duplicate(event_data)
+    if duplicate:
+        log_entry['duplicate'] = True
+        _append_log(log_entry)
+    return duplicate
+
 
-    rdt_status, rdt_result = _send_to_reddit(event_data)
-    if rdt_status is not None:
-        log_entry['reddit_status_code'] = rdt_status
-        log_entry['reddit_response'] = rdt_result
+def _accept_event(request):
+    """Validate and build the canonical event, then dedup or spool it.
 
+    Returns (response, None, None) when the request is answered without
+    delivering here, else (None, event_data, log_entry) for the caller to
+    deliver in its own way.
+    """
+    try:
+        with tracing.span('parse'):
+            body = jsoncodec.loads(request.body)
+    except ValueError:
+        return json_response({'error': 'Invalid JSON'}, status=400), None, None
+
+    event_data = _build_event(body, get_client_ip(request))
+    if event_data is None:
+        return json_response({'error': 'event_name is required'}, status=400), None, None
+
+    log_entry = _new_log_entry(event_data)
+    if _is_duplicate(event_data, log_entry):
+        return json_response({'status': 'duplicate', 'event_id': event_data['event_id']}), None, None
+
+    if settings.EVENT_DELIVERY_MODE == 'async':
+        with tracing.span('spool'):
+            spool.enqueue({'event': event_data, 'log': log_entry})
+        spool.start_dispatcher(_deliver_spooled)
+        response = json_response(
+            {'status': 'queued', 'event_id': event_data.get('event_id')}, status=202,
+        )
+        return response, None, None
+
+    log_entry['payload_sent'] = event_data
+    return None, event_data, log_entry
+
+
+def _release_if_undelivered(event_data, results):
+    """Let a client retry through dedup when no platform took (or is still sending) the event."""
+    if not any(
+        is_deferred(result) or is_delivered(name, status, result)
+        for name, (status, result) in results.items() if status is not None
+    ):
+        dedup.release(event_data)
+
+
+def _delivered(event_data, log_entry, results):
+    _release_if_undelivered(event_data, results)
+    _record_results(log_entry, results)
+    meta_status, meta_result = results['meta']
     _append_log(log_entry)
-    return JsonResponse(meta_result, status=meta_status)
+    if is_deferred(meta_result):
+        # Still being sent; the browser has nothing to retry.
+        return json_response({'status': 'deferred', 'event_id': log_entry['event_id']}, status=202)
+    return json_response(meta_result, status=meta_status)
+
+
+@csrf_exempt
+@require_POST
+@metrics.track_requests
+@tracing.traced
+def send_event(request):
+    # The budget covers the whole request, parsing and dedup included.
+    deadline = Deadline.from_ms(settings.EVENT_DEADLINE_MS)
+    response, event_data, log_entry = _accept_event(request)
+    if response is not None:
+        return response
+    with tracing.span('deliver'):
+        results = deliver_event(event_data, deadline)
+    return _delivered(event_data, log_entry, results)
+
+
+@csrf_exempt
+@require_POST
+@metrics.track_requests
+@tracing.traced
+async def send_event_async(request):
+    """`send_event` for ASGI: platform calls are awaited instead of holding a thread.
+
+    Dedup, spool and log-store writes can wait on a SQLite lock, so they run
+    in worker threads rather than on the event loop.
+    """
+    deadline = Deadline.from_ms(settings.EVENT_DEADLINE_MS)
+    response, event_data, log_entry = await sync_to_async(_accept_event, thread_sensitive=False)(request)
+    if response is not None:
+        return response
+    with tracing.span('deliver'):
+        results = await adeliver_event(event_data, deadline)
+    return await sync_to_async(_delivered, thread_sensitive=False)(event_data, log_entry, results)
+
+
+def _parse_bulk(raw):
+    """Event bodies from a JSON array or NDJSON request body.
+
+    An NDJSON line that doesn't parse becomes None and is rejected on its
+    own; a malformed array raises ValueError.
+    """
+    raw = raw.strip()
+    if raw.startswith(b'['):
+        items = jsoncodec.loads(raw)
+        if not isinstance(items, list):
+            raise ValueError('expected a JSON array')
+        return items
+    items = []
+    for line in raw.splitlines():
+        if line.strip():
+            try:
+                items.append(jsoncodec.loads(line))
+            except ValueError:
+                items.append(None)
+    return items
+
+
+def _bulk_error(body):
+    if not isinstance(body, dict):
+        return 'Invalid event'
+    if not body.get('event_name'):
+        return 'event_name is required'
+    if not isinstance(body.get('user_data', {}), dict):
+        return 'user_data must be an object'
+    return None
+
+
+def _accept_events(request):
+    """`_accept_event` for a bulk body: one pass over every event in it.
+
+    Returns (response, None, None) when the whole request is rejected or
+    was spooled, else (None, statuses, accepted): one status dict per
+    submitted event, and (status, event_data, log_entry) for each event the
+    caller should deliver.
+    """
+    try:
+        with tracing.span('parse'):
+            items = _parse_bulk(request.body)
+    except ValueError:
+        return json_response({'error': 'Invalid JSON'}, status=400), None, None
+    if not items:
+        return json_response({'error': 'No events'}, status=400), None, None
+    if len(items) > settings.EVENT_BULK_MAX_EVENTS:
+        return json_response(
+            {'error': f'At most {settings.EVENT_BULK_MAX_EVENTS} events per request'}, status=413,
+        ), None, None
+
+    client_ip = get_client_ip(request)
+    statuses = []
+    accepted = []
+    for index, body in enumerate(items):
+        error = _bulk_error(body)
+        if error:
+            statuses.append({'index': index, 'status': 'rejected', 'error': error})
+            continue
+        event_data = _build_event(body, client_ip)
+        status = {'index': index, 'event_id': event_data.get('event_id')}
+        statuses.append(status)
+        log_entry = _new_log_entry(event_data, source='bulk')
+        if _is_duplicate(event_data, log_entry):
+            status['status'] = 'duplicate'
+        else:
+            accepted.append((status, event_data, log_entry))
+
+    for status in statuses:
+        if status.get('status') in ('rejected', 'duplicate'):
+            metrics.inc('events_bulk_events_total', outcome=status['status'])
+
+    if accepted and settings.EVENT_DELIVERY_MODE == 'async':
+        with tracing.span('spool'):
+            spool.enqueue_many([{'event': event_data, 'log': log_entry} for _, event_data, log_entry in accepted])
+        spool.start_dispatcher(_deliver_spooled)
+        for status, _, _ in accepted:
+            status['status'] = 'queued'
+        metrics.inc('events_bulk_events_total', len(accepted), outcome='queued')
+        return _bulk_response(statuses, status=202), None, None
+
+    for _, event_data, log_entry in accepted:
+        log_entry['payload_sent'] = event_data
+    return None, statuses, accepted
+
+
+def _unconfirmed(result):
+    return isinstance(result, dict) and result.get('confirmed') is False
+
+
+def _bulk_delivered(statuses, accepted, results):
+    for (status, event_data, log_entry), event_results in zip(accepted, results):
+        _release_if_undelivered(event_data, event_results)
+        _record_results(log_entry, event_results)
+        _append_log(log_entry)
+        status['status'] = 'sent'
+        # A deferred platform is still being sent: 202, as /api/event
+        # answers; so is one whose batch went through unconfirmed per event.
+        status['platforms'] = {
+            name: 202 if is_deferred(result) or _unconfirmed(result) else code
+            for name, (code, result) in event_results.items() if code is not None
+        }
+    if accepted:
+        metrics.inc('events_bulk_events_total', len(accepted), outcome='sent')
+    return _bulk_response(statuses)
+
+
+def _bulk_response(statuses, status=200):
+    return json_response({'received': len(statuses), 'events': statuses}, status=status)
+
+
+@csrf_exempt
+@require_POST
+@metrics.track_requests
+@tracing.traced
+def send_events(request):
+    """Bulk ingest: a JSON array or NDJSON of /api/event bodies.
+
+    The body's content type is not checked, so `navigator.sendBeacon` strings
+    (sent as text/plain) work too. The client IP is looked up once, each
+    event is validated and deduplicated on its own, and the accepted ones
+    are delivered together in per-platform batches.
+    """
+    deadline = Deadline.from_ms(settings.EVENT_DEADLINE_MS)
+    response, statuses, accepted = _accept_events(request)
+    if response is not None:
+        return response
+    with tracing.span('deliver'):
+        results = deliver_events(
+            [event_data for _, event_data, _ in accepted], batched=True,
+            deadline=deadline,
+        )
+    return _bulk_delivered(statuses, accepted, results)
+
+
+@csrf_exempt
+@require_POST
+@metrics.track_requests
+@tracing.traced
+async def send_events_async(request):
+    """`send_events` for ASGI; the batcher is thread-based, so delivery waits in a worker thread.
+
+    As in `send_event_async`, the SQLite work before and after it does too.
+    """
+    deadline = Deadline.from_ms(settings.EVENT_DEADLINE_MS)
+    response, statuses, accepted = await sync_to_async(_accept_events, thread_sensitive=False)(request)
+    if response is not None:
+        return response
+    with tracing.span('deliver'):
+        results = await sync_to_async(deliver_events, thread_sensitive=False)(
+            [event_data for _, event_data, _ in accepted], batched=True,
+            deadline=deadline,
+        )
+    return await sync_to_async(_bulk_delivered, thread_sensitive=False)(statuses, accepted, results)
 
 
 def _append_log(entry):
-    event_log.append(entry)
-    if len(event_log) > MAX_LOG_ENTRIES:
-        del event_log[:len(event_log) - MAX_LOG_ENTRIES]
+    with tracing.span('log'):
+        data = event_log.append(entry)
+        if store.enabled():
+            try:
+                store.append(entry, data.decode())
+            except sqlite3.Error as e:
+                logger.warning('event store write failed', extra={'error': str(e)})
 
 
 @require_GET
 def get_event_log(request):
-    return JsonResponse(list(reversed(event_log)), safe=False)
+    """Newest-first event log.
+
+    Without EVENT_STORE_PATH this is this worker's in-memory ring buffer.
+    With it, entries come from the shared store and can be filtered by
+    event_id, event_name, source, <platform>_status, since and until; pass
+    the X-Next-Cursor response header back as `cursor` for the next page.
+    """
+    try:
+        limit = int(request.GET['limit']) if 'limit' in request.GET else None
+    except ValueError:
+        return json_response({'error': 'limit must be an integer'}, status=400)
+
+    if not store.enabled():
+        if store.FILTER_PARAMS.intersection(request.GET):
+            return json_response({'error': 'Filtering requires EVENT_STORE_PATH'}, status=400)
+        return HttpResponse(event_log.render(limit), content_type='application/json')
+
+    try:
+        entries, next_cursor = store.query(request.GET, limit or 100)
+    except ValueError as e:
+        return json_response({'error': f'Invalid filter: {e}'}, status=400)
+    response = HttpResponse(
+        '[' + ', '.join(entries) + ']', content_type='application/json',
+    )
+    if next_cursor is not None:
+        response['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+
+@require_GET
+def get_metrics(request):
+    """Prometheus metrics: ingest and delivery counters and latencies, dedup, queue and dead-letter depth."""
+    gauges = [
+        ('events_log_records_dropped', 'Log records dropped by this worker because the log queue was full.',
+         {}, AsyncStreamHandler.dropped),
+    ]
+    if settings.EVENT_DEDUP:
+        gauges.append(('events_dedup_cache_size', 'Keys held by the dedup cache.', {}, len(dedup.get_cache())))
+    if settings.EVENT_DELIVERY_MODE == 'async':
+        gauges.append(('events_spool_depth', 'Events waiting in the delivery spool.', {}, spool.depth()))
+    if deadletter.enabled():
+        depth = deadletter.depth()
+        for platform in POSTERS:
+            gauges.append((
+                'events_deadletter_depth', 'Failed platform events waiting for redrive_events.',
+                {'platform': platform}, depth.get(platform, 0),
+            ))
+    return HttpResponse(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,24 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+# Serve /api/event with the coroutine view; the WSGI entry point keeps the sync one.
+os.environ.setdefault('EVENT_INGEST_ASYNC', 'true')
+django_application = get_asgi_application()
+
+from events import clients  # noqa: E402  (needs settings configured)
+
+
+async def application(scope, receive, send):
+    # Django doesn't speak the lifespan protocol; answer it here so the
+    # worker's aiohttp sessions are closed on shutdown.
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await clients.aclose_all()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -28,6 +28,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 ROOT_URLCONF = 'server.urls'
 
 WSGI_APPLICATION = 'server.wsgi.application'
+ASGI_APPLICATION = 'server.asgi.application'
 
 META_ACCESS_TOKEN = os.environ.get('META_ACCESS_TOKEN', '')
 META_PIXEL_ID = os.environ.get('META_PIXEL_ID', '2881174115331441')
@@ -37,3 +38,129 @@ TIKTOK_PIXEL_ID = os.environ.get('TIKTOK_PIXEL_ID', 'D6L0BBRC77UFDH5VO0LG')
 
 REDDIT_ACCESS_TOKEN = os.environ.get('REDDIT_ACCESS_TOKEN', '')
 REDDIT_PIXEL_ID = os.environ.get('REDDIT_PIXEL_ID', 'a2_ibjroms8g8bo')
+
+# Platform API hosts. Point all three at `manage.py mock_platforms`
+# (e.g. http://127.0.0.1:8900) to load test without tokens or network.
+META_API_BASE_URL = os.environ.get('META_API_BASE_URL', 'https://graph.facebook.com')
+TIKTOK_API_BASE_URL = os.environ.get('TIKTOK_API_BASE_URL', 'https://business-api.tiktok.com')
+REDDIT_API_BASE_URL = os.environ.get('REDDIT_API_BASE_URL', 'https://ads-api.reddit.com')
+
+# Outbound delivery: 'sequential' posts to each platform in turn, 'concurrent'
+# fans the calls out over per-platform thread pools of EVENT_DISPATCH_WORKERS.
+EVENT_DISPATCH_MODE = os.environ.get('EVENT_DISPATCH_MODE', 'sequential')
+EVENT_DISPATCH_WORKERS = int(os.environ.get('EVENT_DISPATCH_WORKERS', '12'))
+
+# 'sync' delivers before responding; 'async' spools the event to a local
+# SQLite queue, returns 202 and lets a background dispatcher deliver it.
+EVENT_DELIVERY_MODE = os.environ.get('EVENT_DELIVERY_MODE', 'sync')
+EVENT_SPOOL_PATH = os.environ.get('EVENT_SPOOL_PATH') or str(BASE_DIR / 'event_spool.sqlite3')
+EVENT_SPOOL_MAX_ATTEMPTS = int(os.environ.get('EVENT_SPOOL_MAX_ATTEMPTS', '5'))
+
+# Platform deliveries that end in an error are kept here for
+# `manage.py redrive_events`; empty disables the dead-letter store.
+EVENT_DEADLETTER_PATH = os.environ.get('EVENT_DEADLETTER_PATH', str(BASE_DIR / 'event_deadletter.sqlite3'))
+
+# Micro-batching: group outbound events per platform and pixel, flushing a
+# batch when it reaches EVENT_BATCH_MAX_SIZE or after EVENT_BATCH_MAX_WAIT_MS.
+EVENT_BATCHING = os.environ.get('EVENT_BATCHING', 'False').lower() in ('true', '1', 'yes')
+EVENT_BATCH_MAX_SIZE = int(os.environ.get('EVENT_BATCH_MAX_SIZE', '50'))
+EVENT_BATCH_MAX_WAIT_MS = int(os.environ.get('EVENT_BATCH_MAX_WAIT_MS', '200'))
+
+# Pooled keep-alive sessions to the ad platform APIs (one pool per platform).
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '20'))
+HTTP_KEEPALIVE = os.environ.get('HTTP_KEEPALIVE', 'True').lower() in ('true', '1', 'yes')
+
+# Number of entries kept by the in-memory /api/event-log ring buffer.
+EVENT_LOG_CAPACITY = int(os.environ.get('EVENT_LOG_CAPACITY', '100'))
+
+# Optional SQLite event store shared by all workers; enables filtered and
+# paginated /api/event-log queries. Empty disables it.
+EVENT_STORE_PATH = os.environ.get('EVENT_STORE_PATH', '')
+EVENT_STORE_RETENTION_DAYS = int(os.environ.get('EVENT_STORE_RETENTION_DAYS', '14'))
+
+# Per-platform resilience: retries with jittered exponential backoff for
+# 408/429/5xx and network errors, a circuit breaker, and a cap on in-flight
+# calls (bulkhead) per platform and process.
+PLATFORM_RETRY_ATTEMPTS = int(os.environ.get('PLATFORM_RETRY_ATTEMPTS', '3'))
+PLATFORM_RETRY_BASE_DELAY_MS = int(os.environ.get('PLATFORM_RETRY_BASE_DELAY_MS', '200'))
+PLATFORM_RETRY_MAX_DELAY_MS = int(os.environ.get('PLATFORM_RETRY_MAX_DELAY_MS', '2000'))
+# Without EVENT_DEADLINE_MS, retries stop once another full request timeout
+# would take a call past this long.
+PLATFORM_RETRY_BUDGET_MS = int(os.environ.get('PLATFORM_RETRY_BUDGET_MS', '15000'))
+PLATFORM_BREAKER_THRESHOLD = int(os.environ.get('PLATFORM_BREAKER_THRESHOLD', '5'))
+PLATFORM_BREAKER_RESET_SECONDS = int(os.environ.get('PLATFORM_BREAKER_RESET_SECONDS', '30'))
+PLATFORM_MAX_CONCURRENCY = int(os.environ.get('PLATFORM_MAX_CONCURRENCY', '16'))
+PLATFORM_BULKHEAD_WAIT_MS = int(os.environ.get('PLATFORM_BULKHEAD_WAIT_MS', '100'))
+
+# JSON codec for request bodies, platform payloads and the event log:
+# auto (orjson if installed, else stdlib) | orjson | stdlib.
+JSON_CODEC = os.environ.get('JSON_CODEC', 'auto')
+
+# Most events accepted in one /api/events (bulk) request; larger bodies get 413.
+EVENT_BULK_MAX_EVENTS = int(os.environ.get('EVENT_BULK_MAX_EVENTS', '100'))
+
+# Total time budget for delivering one /api/event request, in milliseconds
+# (0 disables). Platforms that can't finish in time are logged as deferred.
+EVENT_DEADLINE_MS = int(os.environ.get('EVENT_DEADLINE_MS', '0'))
+
+# Drop repeated (event_name, event_id) pairs seen within the TTL before any
+# platform work. 'memory' is per process; 'sqlite' shares EVENT_DEDUP_PATH
+# across workers.
+EVENT_DEDUP = os.environ.get('EVENT_DEDUP', 'True').lower() in ('true', '1', 'yes')
+EVENT_DEDUP_BACKEND = os.environ.get('EVENT_DEDUP_BACKEND', 'memory')
+EVENT_DEDUP_PATH = os.environ.get('EVENT_DEDUP_PATH', str(BASE_DIR / 'event_dedup.sqlite3'))
+EVENT_DEDUP_TTL_SECONDS = int(os.environ.get('EVENT_DEDUP_TTL_SECONDS', '600'))
+EVENT_DEDUP_MAX_SIZE = int(os.environ.get('EVENT_DEDUP_MAX_SIZE', '10000'))
+
+# Structured JSON-lines logging through a non-blocking queue handler. Levels
+# can be set per platform; successful deliveries are logged for a sampled
+# fraction (LOG_SUCCESS_SAMPLE_RATE, 0-1), failures always.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', '1.0'))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'events.log.JsonFormatter'},
+    },
+    'handlers': {
+        'async_stdout': {
+            'class': 'events.log.AsyncStreamHandler',
+            'formatter': 'json',
+            'queue_size': LOG_QUEUE_SIZE,
+        },
+    },
+    'loggers': {
+        'events': {'handlers': ['async_stdout'], 'level': LOG_LEVEL, 'propagate': False},
+        'events.meta': {'level': os.environ.get('LOG_LEVEL_META') or LOG_LEVEL},
+        'events.tiktok': {'level': os.environ.get('LOG_LEVEL_TIKTOK') or LOG_LEVEL},
+        'events.reddit': {'level': os.environ.get('LOG_LEVEL_REDDIT') or LOG_LEVEL},
+    },
+}
+
+# /api/metrics. With METRICS_PATH set, workers add their counters into this
+# shared SQLite file every METRICS_FLUSH_SECONDS so the endpoint reports
+# totals across gunicorn workers; empty (the default) means per-worker
+# counters only. The file's totals belong to METRICS_SCOPE (by default the
+# commit Render deploys) and are emptied when a process of another scope
+# first uses it; an empty scope keeps them across deploys.
+METRICS_PATH = os.environ.get('METRICS_PATH', '')
+METRICS_SCOPE = os.environ.get('METRICS_SCOPE', os.environ.get('RENDER_GIT_COMMIT', ''))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+
+# Per-phase timings for /api/event: a Server-Timing response header, and a
+# sampled fraction of requests appended as JSON lines to EVENT_TRACE_PATH
+# (empty disables trace files).
+EVENT_SERVER_TIMING = os.environ.get('EVENT_SERVER_TIMING', 'True').lower() in ('true', '1', 'yes')
+EVENT_TRACE_PATH = os.environ.get('EVENT_TRACE_PATH', '')
+EVENT_TRACE_SAMPLE_RATE = float(os.environ.get('EVENT_TRACE_SAMPLE_RATE', '0.01'))
+
+# Async ingest. server/asgi.py turns EVENT_INGEST_ASYNC on, routing
+# /api/event to a coroutine view that awaits the platforms through aiohttp
+# (optional dependency) instead of holding a thread per call; WSGI keeps the
+# sync view. Limits apply per platform, per worker process.
+EVENT_INGEST_ASYNC = os.environ.get('EVENT_INGEST_ASYNC', 'False').lower() in ('true', '1', 'yes')
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get('ASYNC_HTTP_MAX_CONNECTIONS', '1000'))
+PLATFORM_MAX_CONCURRENCY_ASYNC = int(os.environ.get('PLATFORM_MAX_CONCURRENCY_ASYNC', '1000'))
@@ -40,6 +40,49 @@ function buildTikTokContents(customData) {
   }));
 }
 
+// --- Server-side batching: events queue up briefly and go to /api/events together ---
+const FLUSH_DELAY_MS = 1000;
+const MAX_QUEUED_EVENTS = 20;
+
+let queue = [];
+let flushTimer = null;
+
+function flushEvents(useBeacon = false) {
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  if (queue.length === 0) return;
+  const batch = queue;
+  queue = [];
+  const body = batch.map((payload) => JSON.stringify(payload)).join('\n');
+
+  // sendBeacon outlives the page; a string body goes as text/plain, which needs no preflight.
+  if (useBeacon && navigator.sendBeacon && navigator.sendBeacon('/api/events', body)) return;
+  fetch('/api/events', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-ndjson' },
+    body,
+    keepalive: true,
+  }).catch((err) => {
+    console.warn('[TrackEvent] Failed to send events:', batch.map((payload) => payload.event_name), err);
+  });
+}
+
+function queueEvent(payload) {
+  queue.push(payload);
+  if (queue.length >= MAX_QUEUED_EVENTS) {
+    flushEvents();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(flushEvents, FLUSH_DELAY_MS);
+  }
+}
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', () => flushEvents(true));
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') flushEvents(true);
+  });
+}
+
 export async function sendEvent({ eventName, eventSourceUrl, userData = {}, customData = {} }) {
   const eventId = generateEventId();
   const url = eventSourceUrl || window.location.href;
@@ -111,13 +154,7 @@ export async function sendEvent({ eventName, eventSourceUrl, userData = {}, cust
     payload.custom_data = customData;
   }
 
-  fetch('/api/event', {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(payload),
-  }).catch((err) => {
-    console.warn('[TrackEvent] Failed to send event:', eventName, err);
-  });
+  queueEvent(payload);
 }
 
 export { sendEvent as sendMetaEvent };